@@ -39,14 +39,31 @@
 # TUNABLES
 # --------
 # - CATCH_UP_LEARNING_DAYS: lookback window for backfill learning.
+# - CS_BACKFILL_END_UTC: optional ISO; pins backfill NOW (unset → current hour).
+#   Set it before toggling the backfill ON so its schedule stays fixed.
 # - CS_STUDY_START_UTC: optional ISO; alignment floor if you use the align DAG.
+#   Alignment replays it in 30-day windows (ALIGN_WINDOW).
+# - CS_EUT_CACHE_DIR: optional path; caches settled EUT /updates windows on disk
+#   (needs diskcache) so backfill retries don't re-download them. Clear with
+#   diskcache.Cache(path).evict("eut").
 # - BINDER_PROC_CAP: ProcessBinder cache cap (default 200000).
 # =============================================================================
 
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import partial, lru_cache
 from datetime import datetime, timedelta, timezone
-import json, logging, requests, time
+import json, logging, requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+
+try:  # orjson is optional in the Airflow image; stdlib json is the fallback
+    import orjson
+
+    _json_dumps, _json_loads = orjson.dumps, orjson.loads
+except ImportError:
+    _json_dumps, _json_loads = (lambda obj: json.dumps(obj).encode()), json.loads
 
 from airflow import DAG
 from airflow.operators.python import PythonOperator
@@ -57,15 +74,31 @@ from airflow.utils import timezone as aftz
 # Config & helpers (unchanged)
 # ────────────────────────────────────────────────────────────────────────
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)sZ %(levelname)s %(message)s",
-    datefmt="%Y-%m-%dT%H:%M:%S",
-)
-logging.Formatter.converter = time.gmtime  # enforce UTC
+# Airflow owns handler/format setup (UTC is configured there); the DAG file only names a logger.
+logger = logging.getLogger("cs_module.orchestrator")
 
-CATCH_UP_LEARNING_DAYS = int(Variable.get("CS_CATCH_UP_LEARNING_DAYS", default_var="1"))
-STUDY_START = Variable.get("CS_STUDY_START_UTC", default_var="2025-06-01T00:00:00Z")
+
+# Variables are read lazily at task run time; only the backfill bounds need them at parse time.
+@lru_cache(maxsize=1)
+def _catch_up_learning_days() -> int:
+    return int(Variable.get("CS_CATCH_UP_LEARNING_DAYS", default_var="1"))
+
+
+@lru_cache(maxsize=1)
+def _backfill_pinned_end() -> datetime | None:
+    """Optional CS_BACKFILL_END_UTC (ISO) → hour-floored aware datetime used as backfill NOW."""
+    raw = Variable.get("CS_BACKFILL_END_UTC", default_var="")
+    if not raw:
+        return None
+    return datetime.fromisoformat(raw.replace("Z", "+00:00")).astimezone(timezone.utc).replace(
+        minute=0, second=0, microsecond=0
+    )
+
+
+@lru_cache(maxsize=1)
+def _study_start() -> datetime:
+    raw = Variable.get("CS_STUDY_START_UTC", default_var="2025-06-01T00:00:00Z")
+    return datetime.fromisoformat(raw.replace("Z", "+00:00")).astimezone(timezone.utc)
 
 
 @lru_cache(maxsize=1)
@@ -81,35 +114,101 @@ def get_cfg():
     }
 
 
-def _eut_get(path: str, params: dict | None = None):
+@lru_cache(maxsize=1)
+def _eut_cache():
+    """Optional on-disk cache of EUT /updates bodies (CS_EUT_CACHE_DIR; unset → disabled)."""
+    path = Variable.get("CS_EUT_CACHE_DIR", default_var="")
+    if not path:
+        return None
+    try:
+        from diskcache import Cache
+    except ImportError:
+        logger.warning("CS_EUT_CACHE_DIR is set but diskcache is not installed; EUT cache disabled")
+        return None
+    return Cache(path)
+
+
+HTTP_TIMEOUT = (5, 60)  # (connect, read) seconds for GETs
+# CS POSTs wait on the connect only: a long /updates replay must not time out into an
+# Airflow retry that re-applies updates CS already learned from (they are not idempotent).
+CS_POST_TIMEOUT = (5, None)
+EUT_CACHE_EXPIRE = 7 * 86400  # seconds a cached /updates window is kept
+EUT_CACHE_SETTLE = timedelta(days=1)  # only windows older than this are cached (late EUT writes)
+ALIGN_WINDOW = timedelta(days=30)  # replay span per EUT /updates call in align_past_updates
+CS_CLOCK_XCOM_KEY = "cs_clock"  # [mode, window_end] already applied to CS in this run
+
+
+@lru_cache(maxsize=1)
+def _session() -> requests.Session:
+    """Shared keep-alive session so EUT/CS calls reuse pooled TCP/TLS connections."""
+    s = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=32,
+        # Single retry layer: transient connect errors and 502/503/504 are retried here with
+        # exponential backoff; POSTs only on connect errors, since CS updates are not idempotent.
+        max_retries=Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=[502, 503, 504],
+            raise_on_status=False,  # hand back the last response so callers report its body
+        ),
+    )
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    # Advertise every codec urllib3 can decode here (gzip/deflate, plus br/zstd if installed).
+    s.headers.update(make_headers(accept_encoding=True))
+    return s
+
+
+def _eut_get_raw(path: str, params: dict | None = None) -> bytes:
+    """GET from EUT and return the undecoded JSON body (forwarded to CS as-is)."""
     cfg = get_cfg()
     url = f"{cfg['EUT_BASE']}{path}"
-    logging.info("GET %s  params=%s", url, params or {})
-    r = requests.get(url, headers=cfg["HEADERS_EUT"], params=params or {})
+    logger.info("GET %s  params=%s", url, params or {})
+    r = _session().get(url, headers=cfg["HEADERS_EUT"], params=params or {}, timeout=HTTP_TIMEOUT)
     if r.status_code != 200:
         raise RuntimeError(f"EUT GET {path} failed: {r.status_code} {r.text}")
-    return r.json()
+    return r.content
 
 
-def _cs_post(endpoint: str, payload, extra_params: dict | None = None):
+def _is_empty_json(raw: bytes) -> bool:
+    # Only tiny bodies can be empty containers; avoid decoding real payloads.
+    return len(raw) <= 16 and not _json_loads(raw or b"null")
+
+
+def _cs_post_raw(endpoint: str, raw: bytes, extra_params: dict | None = None, *, missing_ok: bool = False) -> bool:
+    """POST an already-encoded JSON body to CS, wrapping it as {"data": ..., **extra_params}.
+
+    Returns False instead of raising when missing_ok and CS answers 404 (route not deployed).
+    """
     cfg = get_cfg()
     url = f"{cfg['CS_BASE']}{endpoint}"
+    body = raw
     if extra_params:
-        payload = {"data": payload, **extra_params}
-    logging.info("POST %s  bytes=%d", url, len(json.dumps(payload)))
-    r = requests.post(url, json=payload, headers=cfg["HEADERS_CS"])
+        body = b'{"data": ' + raw + b", " + _json_dumps(extra_params)[1:]
+    logger.info("POST %s  bytes=%d", url, len(body))
+    r = _session().post(url, data=body, headers=cfg["HEADERS_CS"], timeout=CS_POST_TIMEOUT)
+    if missing_ok and r.status_code == 404:
+        return False
     if r.status_code not in (200, 201):
         raise RuntimeError(f"CS POST {endpoint} failed: {r.status_code} {r.text}")
+    return True
+
+
+def _cs_post(endpoint: str, payload, extra_params: dict | None = None, *, missing_ok: bool = False) -> bool:
+    # Encode once; the byte length logged is the body actually sent.
+    return _cs_post_raw(endpoint, _json_dumps(payload), extra_params, missing_ok=missing_ok)
 
 
 def _cs_get(path: str, params: dict | None = None):
     cfg = get_cfg()
     url = f"{cfg['CS_BASE']}{path}"
-    logging.info("GET %s  params=%s", url, params or {})
-    r = requests.get(url, headers=cfg["HEADERS_CS"], params=params or {})
+    logger.info("GET %s  params=%s", url, params or {})
+    r = _session().get(url, headers=cfg["HEADERS_CS"], params=params or {}, timeout=HTTP_TIMEOUT)
     if r.status_code != 200:
         raise RuntimeError(f"CS GET {path} failed: {r.status_code} {r.text}")
-    return r.json()
+    return _json_loads(r.content)
 
 
 def utc_iso(dt: datetime) -> str:
@@ -118,8 +217,23 @@ def utc_iso(dt: datetime) -> str:
     return dt.astimezone(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
 
 
+def _utc_iso_fast(dt: datetime) -> str:
+    """utc_iso for datetimes the caller already holds in UTC (no tz check or conversion)."""
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+_cs_set_clock_missing = False  # set once an older CS image answers 404 on /set_clock
+
+
 def _prepare_cs_clock(window_end_utc: datetime, *, time_mode: str):
+    global _cs_set_clock_missing
     time_mode = (time_mode or "REAL").upper()
+    if not _cs_set_clock_missing:
+        payload = {"mode": time_mode, "time": utc_iso(window_end_utc) if time_mode == "FROZEN" else None}
+        if _cs_post("/set_clock", payload, missing_ok=True):
+            return
+        _cs_set_clock_missing = True
+        logger.info("CS has no /set_clock; falling back to /set_time_mode + /set_current_time")
     _cs_post("/set_time_mode", {"mode": time_mode})
     if time_mode == "FROZEN":
         _cs_post("/set_current_time", utc_iso(window_end_utc))
@@ -136,30 +250,44 @@ def fetch_static_objects():
         "/resources": "/internal/recommendations?resources=true",
         "/missions": "/missions",
     }
-    for endpoint, path in mappings.items():
-        data = _eut_get(path)
-        if data:
-            _cs_post(endpoint, data)
-        else:
-            logging.warning("No data for %s", endpoint)
+    # The three EUT downloads are independent; fetch them concurrently and post each as it lands.
+    with ThreadPoolExecutor(max_workers=len(mappings)) as pool:
+        futures = {pool.submit(_eut_get_raw, path): endpoint for endpoint, path in mappings.items()}
+        for fut in as_completed(futures):
+            endpoint = futures[fut]
+            raw = fut.result()
+            if not _is_empty_json(raw):
+                _cs_post_raw(endpoint, raw)
+            else:
+                logger.warning("No data for %s", endpoint)
 
 
 def _fetch_updates_window(start_dt: datetime, end_dt: datetime, *, is_learning: bool, is_intervention: bool):
-    params = {"start_date": utc_iso(start_dt), "end_date": utc_iso(end_dt)}
-    data = _eut_get("/updates", params=params)
-    if data:
-        _cs_post("/updates", data, extra_params={"is_learning": is_learning, "is_intervention": is_intervention})
+    params = {"start_date": _utc_iso_fast(start_dt), "end_date": _utc_iso_fast(end_dt)}
+    cache = _eut_cache() if end_dt <= datetime.now(timezone.utc) - EUT_CACHE_SETTLE else None
+    key = ("eut", "/updates", params["start_date"], params["end_date"])
+    raw = cache.get(key) if cache is not None else None
+    if raw is None:
+        raw = _eut_get_raw("/updates", params=params)
+        if cache is not None:
+            cache.set(key, raw, expire=EUT_CACHE_EXPIRE, tag="eut")
+    else:
+        logger.info("EUT /updates %s → %s served from disk cache", params["start_date"], params["end_date"])
+    if not _is_empty_json(raw):
+        _cs_post_raw("/updates", raw, extra_params={"is_learning": is_learning, "is_intervention": is_intervention})
     else:
-        logging.info("No updates for window %s → %s", params["start_date"], params["end_date"])
+        logger.info("No updates for window %s → %s", params["start_date"], params["end_date"])
 
 
 def align_past_updates(*, time_mode: str):
-    cursor = datetime.fromisoformat(STUDY_START.replace("Z", "+00:00"))
-    stop_at = (datetime.now(timezone.utc) - timedelta(days=CATCH_UP_LEARNING_DAYS)).replace(
+    cursor = _study_start()
+    stop_at = (datetime.now(timezone.utc) - timedelta(days=_catch_up_learning_days())).replace(
         minute=0, second=0, microsecond=0
     )
+    # Replay in wide windows: alignment neither learns nor plans, so the CS clock only
+    # needs to be moved once per window instead of once per day.
     while cursor < stop_at:
-        window_end = min(cursor + timedelta(days=1), stop_at)
+        window_end = min(cursor + ALIGN_WINDOW, stop_at)
         _prepare_cs_clock(window_end, time_mode=time_mode)
         _fetch_updates_window(cursor, window_end, is_learning=False, is_intervention=False)
         cursor = window_end
@@ -169,17 +297,21 @@ def hourly_update(*, time_mode: str, is_learning: bool, is_intervention: bool, *
     end = context["logical_date"].astimezone(timezone.utc)
     start = (end - timedelta(hours=1)).astimezone(timezone.utc)
     _prepare_cs_clock(end, time_mode=time_mode)
-    logging.info("INTERVAL %s → %s", start.isoformat(), end.isoformat())
+    # Let fetch_selected_contents (same run, same logical_date) skip re-setting the clock.
+    context["ti"].xcom_push(key=CS_CLOCK_XCOM_KEY, value=[time_mode.upper(), _utc_iso_fast(end)])
+    logger.info("INTERVAL %s → %s", start.isoformat(), end.isoformat())
     _fetch_updates_window(start, end, is_learning=is_learning, is_intervention=is_intervention)
 
 
 def fetch_selected_contents(*, time_mode: str, **context):
     end = context["logical_date"].astimezone(timezone.utc)
     start = (end - timedelta(hours=1)).astimezone(timezone.utc)
-    _prepare_cs_clock(end, time_mode=time_mode)
-    params = {"start_time": utc_iso(start), "end_time": utc_iso(end)}
+    prepared = context["ti"].xcom_pull(task_ids="hourly_update", key=CS_CLOCK_XCOM_KEY)
+    if prepared != [time_mode.upper(), _utc_iso_fast(end)]:
+        _prepare_cs_clock(end, time_mode=time_mode)
+    params = {"start_time": _utc_iso_fast(start), "end_time": _utc_iso_fast(end)}
     data = _cs_get("/selected_contents", params=params)
-    logging.info("Retrieved selected_contents payload:\n%s", json.dumps(data, indent=2))
+    logger.info("Retrieved selected_contents payload:\n%s", json.dumps(data, indent=2))
 
 
 # ────────────────────────────────────────────────────────────────────────
@@ -213,8 +345,14 @@ with DAG(
 # ────────────────────────────────────────────────────────────────────────
 # DAG 2 — Backfill (learn / no intervene; hourly; FROZEN; catchup=True)
 # ────────────────────────────────────────────────────────────────────────
-NOW = aftz.utcnow().replace(minute=0, second=0, microsecond=0)
-BACKFILL_START = NOW - timedelta(days=CATCH_UP_LEARNING_DAYS)
+# Runs stay strictly serial (max_active_runs=1, depends_on_past=True): the CS
+# FROZEN clock is a single global cursor and learning is order-sensitive
+# (mission snapshots, binder sends → ratings), so hours cannot be replayed
+# concurrently or out of order.
+# The backfill bounds are the only values needed at parse time. Pinning CS_BACKFILL_END_UTC
+# keeps start_date/end_date identical across scheduler parses while a backfill runs.
+NOW = _backfill_pinned_end() or aftz.utcnow().replace(minute=0, second=0, microsecond=0)
+BACKFILL_START = NOW - timedelta(days=_catch_up_learning_days())
 BACKFILL_END = NOW - timedelta(hours=1)
 
 with DAG(
@@ -1,15 +1,40 @@
 import logging
+import math
 import os
 import json
 import numpy as np
 from datetime import timedelta
+from operator import itemgetter
+from collections import defaultdict
 from cs_module.content_selection.engine import RecommendationEngine
 from cs_module.content_selection.mab_initialiser import MABInitialiser
 from cs_module.content_selection.user_manager import UserManager
 from cs_module.content_selection.mab_updater import MABUpdater
 from cs_module.utils.data_storage import DataStorage
 from cs_module.utils.process_binder import ProcessBinder
-from cs_module.utils.logging_utils import pretty
+from cs_module.utils.logging_utils import lazy_pretty
+
+try:  # optional: serializes ndarrays natively; stdlib json + list conversion otherwise
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _to_plain_json(obj):
+    """Mirror orjson's save_output encoding for stdlib json: numpy to Python, non-finite floats to null."""
+    if isinstance(obj, (np.ndarray, np.generic)):
+        obj = obj.tolist()
+    if isinstance(obj, dict):
+        return {key: _to_plain_json(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_plain_json(item) for item in obj]
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    return obj
+
+
+# Tie-break for mission events sharing a timestamp: selections are applied before accomplishments
+_SELECT, _ACCOMPLISH = 0, 1
 
 
 class ContentSelection:
@@ -32,6 +57,7 @@ class ContentSelection:
 
         self.mab_updater = None
         self.recommendation_engine = None
+        self._output_dirs_ready = set()  # directories save_output has already created
 
     def initialise_missions(self, missions):
         self.missions = {rec["mission_id"]: rec for rec in missions}
@@ -54,14 +80,23 @@ class ContentSelection:
 
     def save_output(self, output, filename):
         path = f"outputs/{filename}.json"
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-
-        # Convert any ndarray objects to lists
-        output = self.convert_ndarrays_to_lists(output)
+        out_dir = os.path.dirname(path)
+        if out_dir not in self._output_dirs_ready:
+            os.makedirs(out_dir, exist_ok=True)
+            self._output_dirs_ready.add(out_dir)
+
+        # Serialize in memory and write once, rather than json.dump's many small writes.
+        # Both paths write the same format: 2-space indent, UTF-8, NaN/inf as null.
+        if orjson is not None:
+            payload = orjson.dumps(
+                output, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2
+            )
+        else:
+            payload = json.dumps(_to_plain_json(output), indent=2, ensure_ascii=False).encode()
 
         try:
-            with open(path, "w") as f:
-                json.dump(output, f, indent=4)
+            with open(path, "wb") as f:
+                f.write(payload)
             print(f"Output saved to {path}")
             logging.info(f"Output saved to {path}")
         except (IOError, OSError) as e:
@@ -71,6 +106,7 @@ class ContentSelection:
     def update(self, updates, is_learning, is_intervention):
         logging.info("Delivering intervention: %s", is_intervention)
         logging.info("MAB learning: %s", is_learning)
+        now = self.time_handler.now  # one fallback "now" for the whole tick
         if self.mab_updater is None:
             self.mab_updater = MABUpdater(
                 binder=self.binder,
@@ -86,16 +122,16 @@ class ContentSelection:
             )
 
         if "new_users" in updates:
-            logging.info("New users:\n%s", pretty(updates["new_users"]))
+            logging.info("New users:\n%s", lazy_pretty(updates["new_users"]))
             new_users = updates["new_users"]
-            self._normalize_new_users(new_users)
+            self._normalize_new_users(new_users, now)
             self.data_storage.add_users(new_users)
             self.user_manager.add_users(new_users)
 
-        known_users = set(self.user_manager.get_all_users())
+        known_users = self.user_manager.known_user_ids()
 
         if "health_habit_assessments" in updates:
-            logging.info("Health Habit Assessments:\n%s", pretty(updates["health_habit_assessments"]))
+            logging.info("Health Habit Assessments:\n%s", lazy_pretty(updates["health_habit_assessments"]))
             health_habit_assessments = updates["health_habit_assessments"]
 
             # 1) Filter to known users (like user_feedback)
@@ -117,7 +153,7 @@ class ContentSelection:
         # User feedback (persist + filtered) -------------------------------------
         raw_feedback = updates.get("user_feedback", {})
         if raw_feedback:
-            logging.info("User feedback:\n%s", pretty(raw_feedback, max_chars=20000))
+            logging.info("User feedback:\n%s", lazy_pretty(raw_feedback, max_chars=20000))
             filtered_feedback = {uid: fb for uid, fb in raw_feedback.items() if uid in known_users}
             missing = set(raw_feedback) - set(filtered_feedback)
             for uid in missing:
@@ -125,21 +161,21 @@ class ContentSelection:
 
             for uid, fb in filtered_feedback.items():
                 if "events" in fb and fb["events"]:
-                    fb["events"] = self._sort_feedback_events(fb["events"])
+                    fb["events"] = self._sort_feedback_events(fb["events"], now)
             self.data_storage.add_user_feedback(filtered_feedback)
 
         # New missions and contents (persist + filtered) -------------------------
         new_missions_and_contents = updates.get("new_missions_and_contents", {})
         if new_missions_and_contents:
-            logging.info("New missions and contents:\n%s", pretty(new_missions_and_contents))
+            logging.info("New missions and contents:\n%s", lazy_pretty(new_missions_and_contents))
             filtered_nmac = {uid: nm for uid, nm in new_missions_and_contents.items() if uid in known_users}
             missing = set(new_missions_and_contents) - set(filtered_nmac)
             for uid in missing:
                 logging.warning(f"User {uid} not found. Skipping new_missions_and_contents.")
             self.data_storage.add_new_missions_and_contents(filtered_nmac)
 
-        # 3) Merge & order mission-affecting events by timestamp
-        merged_by_user = {}
+        # 3) Merge & order mission-affecting events by timestamp: (ts, kind, payload) per user
+        merged_by_user = defaultdict(list)
 
         # 3a) From feedback: mission accomplished
         for user_id, fb in filtered_feedback.items():
@@ -153,13 +189,8 @@ class ContentSelection:
                 except Exception as e:
                     logging.warning("Bad feedback timestamp %r for user %s (%s) -> skip", ts_raw, user_id, e)
                     continue
-                merged_by_user.setdefault(user_id, []).append(
-                    {
-                        "ts": ts,
-                        "type": "accomplish",
-                        "mission_id": ev["properties"]["mission_id"],
-                        "score": ev["properties"].get("score"),
-                    }
+                merged_by_user[user_id].append(
+                    (ts, _ACCOMPLISH, (ev["properties"]["mission_id"], ev["properties"].get("score")))
                 )
 
         # 3b) From new missions: mission selected
@@ -172,40 +203,33 @@ class ContentSelection:
                     ts = self.time_handler.parse_client_ts(ts_raw, mute_naive_warning=True)
                 except Exception as e:
                     logging.warning("Bad selection timestamp %r for user %s (%s) -> use now()", ts_raw, user_id, e)
-                    ts = self.time_handler.now
-                merged_by_user.setdefault(user_id, []).append(
-                    {
-                        "ts": ts,
-                        "type": "select",
-                        "mission": m,  # full mission dict (mission, recommendations, resources, prescribed, ... timestamps)
-                    }
-                )
+                    ts = now
+                # full mission dict (mission, recommendations, resources, prescribed, ... timestamps)
+                merged_by_user[user_id].append((ts, _SELECT, m))
 
-        # 3c) Apply per-user in chronological order
+        # 3c) Apply per-user in chronological order (select < accomplish on ties)
         for user_id, items in merged_by_user.items():
-            # select < accomplish on ties
-            order = {"select": 0, "accomplish": 1}
-            items.sort(key=lambda x: (x["ts"], order[x["type"]]))
-            for ev in items:
-                if ev["type"] == "select":
-                    self.user_manager.apply_mission_selected(user_id, ev["mission"])
-                elif ev["type"] == "accomplish":
-                    self.user_manager.apply_mission_accomplished(user_id, ev["mission_id"], ev.get("score"))
+            items.sort(key=itemgetter(0, 1))
+            for _, kind, payload in items:
+                if kind == _SELECT:
+                    self.user_manager.apply_mission_selected(user_id, payload)
+                else:
+                    mission_id, score = payload
+                    self.user_manager.apply_mission_accomplished(user_id, mission_id, score)
 
         # 4) MAB learning still uses the full filtered_feedback (unchanged)
         if raw_feedback and is_learning:
-            # Filter to known users (again) for MAB update
-            filtered_feedback = {uid: fb for uid, fb in raw_feedback.items() if uid in known_users}
+            # Already filtered to known users (and events sorted) above
             self.mab_updater.update_all(filtered_feedback)
 
         if "escalation_level" in updates:
-            logging.info("Escalation levels:\n%s", pretty(updates["escalation_level"]))
+            logging.info("Escalation levels:\n%s", lazy_pretty(updates["escalation_level"]))
             escalation_levels = updates["escalation_level"]
             self.data_storage.add_escalation_levels(escalation_levels)
             self.user_manager.update_escalation_levels(escalation_levels)
 
         if "disabled_users" in updates:
-            logging.info("Disabled users:\n%s", pretty(updates["disabled_users"]))
+            logging.info("Disabled users:\n%s", lazy_pretty(updates["disabled_users"]))
             disabled_users = updates["disabled_users"]
             self.data_storage.add_disabled_users(disabled_users)
             self.user_manager.disable_users(disabled_users)
@@ -232,8 +256,8 @@ class ContentSelection:
         self.user_manager.save_recommendation_plans(recommendation_plans)
         return True
 
-    def _normalize_new_users(self, new_users: dict) -> None:
-        """Ensure enrolmentDate is a valid ISO string; on invalid, log and use time_handler.now."""
+    def _normalize_new_users(self, new_users: dict, now) -> None:
+        """Ensure enrolmentDate is a valid ISO string; on invalid, log and use now."""
         for uid, data in new_users.items():
             raw = data.get("enrolmentDate")
             try:
@@ -242,14 +266,14 @@ class ContentSelection:
                     raise ValueError("missing or invalid enrolmentDate")
                 dt = self.time_handler.parse_client_ts(raw, mute_naive_warning=True)  # -> aware datetime,
             except Exception as e:
-                dt = self.time_handler.now  # aware UTC from TimeHandler
+                dt = now  # aware UTC from TimeHandler
                 logging.warning(
                     "User %s enrolmentDate invalid (%r, %s); using now=%s", uid, raw, e, self.time_handler.utc_iso(dt)
                 )
             # Keep a normalized ISO UTC string for downstream (DB & logs)
             data["enrolmentDate"] = self.time_handler.utc_iso(dt)
 
-    def _sort_feedback_events(self, events):
+    def _sort_feedback_events(self, events, now):
         order = {
             "recommendation_sent": 0,
             "recommendation_opened": 1,
@@ -263,7 +287,7 @@ class ContentSelection:
             try:
                 ts = self.time_handler.parse_client_ts(ts_raw, mute_naive_warning=True)
             except Exception:
-                ts = self.time_handler.now
+                ts = now
             # event priority (unknowns go last), then process_id to get stable order on ties
             typ = ev.get("event_name") or ""
             pri = order.get(typ, 99)
@@ -289,7 +313,7 @@ class ContentSelection:
 
         selected_contents = {}
         user_to_mission_id = {}
-        for user_id, user in self.user_manager.get_all_users().items():
+        for user_id, user in self.user_manager.get_users_needing_plan():
             if user.new_plan_required:
                 new_missions = user.get_new_missions()
                 # PILOT STUDY WILL HAVE ONE MISSION AT A TIME
@@ -297,13 +321,15 @@ class ContentSelection:
                     # pick the most recent selection, can happen during normal run if user changes inside hour but also if something breaks
                     # IMAGINE MY MODULE CRASHES, IN THE GAP TO FIX IT USERS CAN CHANGE MISSIONS,
                     # WHEN WE GO BACK TO LIVE WE PLAN ONLY FOR THE MOST RECENT ONE
-                    mission = max(
-                        new_missions, key=lambda m: user.time_handler.parse_client_ts(m["selection_timestamp"])
+                    # parse each selection time once; the winner's is reused as the plan start below
+                    start_time, mission = max(
+                        ((self.time_handler.parse_client_ts(m["selection_timestamp"]), m) for m in new_missions),
+                        key=itemgetter(0),
                     )
                     user_to_mission_id[user_id] = mission["mission"]
 
                     # CLEAR only if other missions have been selected before this one:
-                    older_ids = [m["mission"] for m in new_missions if m["mission"] != mission["mission"]]
+                    older_ids = {m["mission"] for m in new_missions if m["mission"] != mission["mission"]}
                     if older_ids:
                         user.set_missions_plan_to_false(older_ids)
                 else:
@@ -314,7 +340,6 @@ class ContentSelection:
                 selected_recommendations = self.recommendation_engine.get_recommendations_to_send(user_id)
                 selected_contents[user_id]["contents"] = selected_resources + selected_recommendations
 
-                start_time = self.time_handler.parse_client_ts(mission["selection_timestamp"])
                 end_time = start_time + timedelta(days=7)
 
                 selected_contents[user_id]["mission_start_time"] = self.time_handler.utc_iso(start_time)
@@ -322,7 +347,7 @@ class ContentSelection:
 
                 plan_id = self.recommendation_engine.get_current_plan_id(user_id)
                 selected_contents[user_id]["plan_id"] = str(plan_id)
-                logging.info("Selected contents for user %s:\n%s", user_id, pretty(selected_contents[user_id]))
+                logging.info("Selected contents for user %s:\n%s", user_id, lazy_pretty(selected_contents[user_id]))
                 user.new_plan_required = False
                 user.set_missions_plan_to_false([user_to_mission_id[user_id]])
                 user.selected_contents = selected_contents[user_id]
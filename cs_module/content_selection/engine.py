@@ -1,8 +1,8 @@
-from cs_module.config import MIN_NUM_REC_PER_MISSION, MAX_NUM_REC_PER_MISSION
+from cs_module.config import MIN_NUM_REC_PER_MISSION, MAX_NUM_REC_PER_MISSION, INTERVENTION_MAB_CONFIG
 from .user_manager import UserManager
 from .feature_builders import get_mission_to_feature_vec_to_rec_ids
 from .selector import select_recommendation, select_resource
-from .frequency_updaters import update_frequency_offsets
+from .frequency_updaters import update_frequency_offsets, new_intervention_frequency_offset
 from cs_module.utils.process_binder import ProcessBinder
 
 import uuid
@@ -10,6 +10,8 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+_INT_MAB_TYPE = INTERVENTION_MAB_CONFIG["type"]  # fixed by the generated config
+
 
 class RecommendationEngine:
     def __init__(
@@ -36,6 +38,7 @@ class RecommendationEngine:
         self.data_storage = data_storage
         self.time_handler = time_handler
         self.selection_id = {}
+        self._rec_static = {}  # rec_id -> (pillar, intervention_type, mix), see feature_builders
 
     # helper to roll a new weekly plan **after** everything is saved
     def rotate_plan_id(self, user_id):
@@ -63,13 +66,12 @@ class RecommendationEngine:
             m["mission"]: user.get_available_recommendations(m["mission"]) for m in user_missions
         }
 
-        mission_to_available_recs_unchanged = {
-            m["mission"]: user.get_available_recommendations(m["mission"]) for m in user_missions
-        }
+        # snapshot before the per-slot pruning below (only used for EoW membership checks)
+        mission_to_available_recs_unchanged = {m: set(recs) for m, recs in mission_to_available_recs.items()}
 
         selected_recs = []
         total_freq_offset = 0
-        intv_to_freq_offset = {}
+        intv_to_freq_offset = new_intervention_frequency_offset()
         rec_to_freq_offset = {}
         mission_to_selected_rec_to_count = {}
 
@@ -83,7 +85,7 @@ class RecommendationEngine:
             count = 1
             for _ in range(num_slots):
                 mission_to_feature_vec_to_rec_ids = get_mission_to_feature_vec_to_rec_ids(
-                    user=self.user_manager.get_user(user_id),
+                    user=user,
                     missions=self.missions,
                     recommendations=self.recommendations,
                     mission_id_to_avail_rec_ids=mission_to_available_recs,
@@ -91,6 +93,7 @@ class RecommendationEngine:
                     intv_to_freq_offset=intv_to_freq_offset,
                     rec_to_freq_offset=rec_to_freq_offset,
                     prompted=False,
+                    rec_static=self._rec_static,
                 )
                 fv_map = mission_to_feature_vec_to_rec_ids.get(mission_id)
                 if not fv_map:
@@ -147,26 +150,27 @@ class RecommendationEngine:
 
                 # ANTICIPATE END OF WEEK RECOMMENDATIONS
                 # IT SHOULD WORK EVEN WITH MULTIPLE
-                mission_to_feature_vec_to_rec_ids = get_mission_to_feature_vec_to_rec_ids(
-                    user=self.user_manager.get_user(user_id),
-                    missions=self.missions,
-                    recommendations=self.recommendations,
-                    mission_id_to_avail_rec_ids=mission_to_available_recs_unchanged,
-                    total_freq_offset=total_freq_offset,
-                    intv_to_freq_offset=intv_to_freq_offset,
-                    rec_to_freq_offset=rec_to_freq_offset,
-                    prompted=True,  # Prompted to user
-                )
-                feature_vec_to_rec_ids = mission_to_feature_vec_to_rec_ids[mission_id]
-
-                # Find the matching feature vector key, if any
-                matches = [key for key, rec_ids in feature_vec_to_rec_ids.items() if sel_rec_id in rec_ids]
-                if matches:
-                    eow_fv = matches[0]
+                if sel_rec_id not in mission_to_available_recs_unchanged.get(mission_id, ()):
+                    logger.warning(f"No EoW feature vector found for rec_id={sel_rec_id} in mission {mission_id}")
+                elif _INT_MAB_TYPE == "None":
+                    # No intervention bandit to feed: only mark the rec so its EoW rating still updates the rec MAB
+                    user.eow_rec_id_to_fv[sel_rec_id] = None
+                else:
+                    # Only the selected rec's FV is needed, and it does not depend on the other recs
+                    mission_to_feature_vec_to_rec_ids = get_mission_to_feature_vec_to_rec_ids(
+                        user=user,
+                        missions=self.missions,
+                        recommendations=self.recommendations,
+                        mission_id_to_avail_rec_ids={mission_id: [sel_rec_id]},
+                        total_freq_offset=total_freq_offset,
+                        intv_to_freq_offset=intv_to_freq_offset,
+                        rec_to_freq_offset=rec_to_freq_offset,
+                        prompted=True,  # Prompted to user
+                        rec_static=self._rec_static,
+                    )
+                    eow_fv = next(iter(mission_to_feature_vec_to_rec_ids[mission_id]))
                     # Option A (robust): store a normalized list so later code is simpler
                     user.eow_rec_id_to_fv[sel_rec_id] = self._to_float_array_or_none(eow_fv)
-                else:
-                    logger.warning(f"No EoW feature vector found for rec_id={sel_rec_id} in mission {mission_id}")
 
                 mission_to_available_recs = user.update_avail_recommendations(mission_to_available_recs, sel_rec_id)
                 if not mission_to_available_recs[mission_id]:
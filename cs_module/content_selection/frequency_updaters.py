@@ -1,6 +1,25 @@
+import numpy as np
 from cs_module.config import MAX_SAME_REC_SENT_PER_MISSION, MAX_DISTINCT_REC_PER_MISSION, INTERVENTION_TYPES
 from cs_module.utils.encoding import get_intervention_encoding  # normalized mixture
 
+_MIX_CACHE = {}
+
+
+def get_intervention_mix(intervention_type):
+    """Mixture weights aligned to INTERVENTION_TYPES as a read-only array, cached per tag set."""
+    key = tuple(intervention_type or ())
+    mix = _MIX_CACHE.get(key)
+    if mix is None:
+        mix = np.asarray(get_intervention_encoding(intervention_type), dtype=np.float64)
+        mix.setflags(write=False)
+        _MIX_CACHE[key] = mix
+    return mix
+
+
+def new_intervention_frequency_offset():
+    """Mixture-weighted counts scheduled this week, indexed like INTERVENTION_TYPES."""
+    return np.zeros(len(INTERVENTION_TYPES), dtype=np.float64)
+
 
 def update_frequency_offsets(
     sel_rec_id,
@@ -13,28 +32,25 @@ def update_frequency_offsets(
     recommendations,
 ):
     # count selection
-    mission_to_selected_rec_to_count.setdefault(mission_id, {})
-    mission_to_selected_rec_to_count[mission_id][sel_rec_id] = (
-        mission_to_selected_rec_to_count[mission_id].get(sel_rec_id, 0) + 1
-    )
+    selected_rec_to_count = mission_to_selected_rec_to_count.setdefault(mission_id, {})
+    selected_rec_to_count[sel_rec_id] = selected_rec_to_count.get(sel_rec_id, 0) + 1
     # update offsets
     total_freq_offset += 1
 
-    mix = get_intervention_encoding(recommendations[sel_rec_id]["intervention_type"])  # len=8 weights
-    for itype, w in zip(INTERVENTION_TYPES, mix):
-        if w:
-            intv_to_freq_offset[itype] = intv_to_freq_offset.get(itype, 0.0) + w
+    # in place, like rec_to_freq_offset: callers own the array from new_intervention_frequency_offset()
+    intv_to_freq_offset += get_intervention_mix(recommendations[sel_rec_id]["intervention_type"])
 
     rec_to_freq_offset[sel_rec_id] = rec_to_freq_offset.get(sel_rec_id, 0) + 1
 
     # enforce repetition limits
-    if mission_to_selected_rec_to_count[mission_id][sel_rec_id] >= MAX_SAME_REC_SENT_PER_MISSION:
+    if selected_rec_to_count[sel_rec_id] >= MAX_SAME_REC_SENT_PER_MISSION:
         mission_to_available_recs[mission_id].remove(sel_rec_id)
 
-    if len(mission_to_selected_rec_to_count[mission_id]) >= MAX_DISTINCT_REC_PER_MISSION:
-        curr = set(mission_to_available_recs[mission_id])
-        used = set(mission_to_selected_rec_to_count[mission_id].keys())
-        mission_to_available_recs[mission_id] = list(curr & used)
+    if len(selected_rec_to_count) >= MAX_DISTINCT_REC_PER_MISSION:
+        # keep only already-used recs; the count dict is the lookup set, list order is preserved
+        mission_to_available_recs[mission_id] = [
+            r for r in mission_to_available_recs[mission_id] if r in selected_rec_to_count
+        ]
 
     return (
         mission_to_selected_rec_to_count,
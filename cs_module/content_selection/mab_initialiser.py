@@ -3,6 +3,7 @@
 import logging
 import json
 import os
+from functools import lru_cache
 
 from cs_module.multi_armed_bandit.logistic_laplace_ts import LogisticLaplaceTS
 from cs_module.multi_armed_bandit.bernoulli_beta_ts import BernoulliBetaTS
@@ -16,6 +17,42 @@ from cs_module.config import INTERVENTION_MAB_CONFIG, RECOMMENDATION_MAB_CONFIG,
 
 logger = logging.getLogger(__name__)
 
+_PREFERENCES_DIR = os.path.join(os.path.dirname(__file__), "..", "user_preferences")
+_RES_PREFERENCES_PATH = os.path.join(_PREFERENCES_DIR, "res_preferences.json")
+_INT_PREFERENCES_PATH = os.path.join(_PREFERENCES_DIR, "int_preferences.json")
+_REC_PREFERENCES_PATH = os.path.join(_PREFERENCES_DIR, "rec_preferences.json")
+
+
+@lru_cache(maxsize=None)
+def _load_json(path):
+    """Parsed preference file, read once per process (the optimal bandits never mutate it)."""
+    with open(path) as f:
+        return json.load(f)
+
+
+def _beta_ts_kwargs(config):
+    return {k: config[k] for k in ("alpha_0", "beta_0") if k in config}
+
+
+# type -> factory, per bandit role; "None" disables the intervention bandit
+_RESOURCE_MAB_BUILDERS = {
+    "BernoulliBetaTS": lambda: BernoulliBetaTS(**_beta_ts_kwargs(RESOURCE_MAB_CONFIG)),
+    "ResourceOptimalBandit": lambda: ResourceOptimalBandit(resource_pref=_load_json(_RES_PREFERENCES_PATH)),
+    "RandomBandit": RandomBandit,
+}
+_INTERVENTION_MAB_BUILDERS = {
+    "LogisticLaplaceTS": lambda: LogisticLaplaceTS(feature_dim=get_dim_intervention_feature_vector(include_bias=True)),
+    "None": lambda: None,
+}
+_RECOMMENDATION_MAB_BUILDERS = {
+    "BernoulliBetaTS": lambda: BernoulliBetaTS(**_beta_ts_kwargs(RECOMMENDATION_MAB_CONFIG)),
+    "RecommendationOptimalBandit": lambda: RecommendationOptimalBandit(
+        intervention_pref=_load_json(_INT_PREFERENCES_PATH),
+        recommendation_pref=_load_json(_REC_PREFERENCES_PATH),
+    ),
+    "RandomBandit": RandomBandit,
+}
+
 
 class MABInitialiser:
     def __init__(self, data_storage):
@@ -25,86 +62,29 @@ class MABInitialiser:
         self.intervention_mab = self._init_intervention_mab()
         self.recommendation_mab = self._init_recommendation_mab()
 
-    def _init_resource_mab(self):
-        t = RESOURCE_MAB_CONFIG["type"]
-        logger.info(f"Initializing resource MAB with mode: {t}...")
-
-        if t == "BernoulliBetaTS":
-            kwargs = {}
-            if "alpha_0" in RESOURCE_MAB_CONFIG:
-                kwargs["alpha_0"] = RESOURCE_MAB_CONFIG["alpha_0"]
-            if "beta_0" in RESOURCE_MAB_CONFIG:
-                kwargs["beta_0"] = RESOURCE_MAB_CONFIG["beta_0"]
-            mab = BernoulliBetaTS(**kwargs)
-
-        elif t == "ResourceOptimalBandit":
-            path = os.path.join(os.path.dirname(__file__), "..", "user_preferences", "res_preferences.json")
-            with open(path) as f:
-                resource_pref = json.load(f)
-            mab = ResourceOptimalBandit(resource_pref=resource_pref)
-
-        elif t == "RandomBandit":
-            mab = RandomBandit()
-
-        else:
-            raise ValueError(f"Unknown resource_mab_mode: {t}")
-
-        self.data_storage.initialize_bandit(
-            table="resource_mab_runs", bandit_type=t, initial_params=mab.initial_parameters
-        )
-        return mab
+    def _init_mab(self, role, config, builders, table):
+        t = config["type"]
+        logger.info(f"Initializing {role} MAB with mode: {t}...")
 
-    def _init_intervention_mab(self):
-        t = INTERVENTION_MAB_CONFIG["type"]
-        logger.info(f"Initializing intervention MAB with mode: {t}...")
-
-        if t == "LogisticLaplaceTS":
-            dim = get_dim_intervention_feature_vector(include_bias=True)
-            mab = LogisticLaplaceTS(feature_dim=dim)
-
-        elif t == "None":
+        builder = builders.get(t)
+        if builder is None:
+            raise ValueError(f"Unknown {role}_mab_mode: {t}")
+        mab = builder()
+        if mab is None:
             return None
 
-        else:
-            raise ValueError(f"Unknown intervention_mab_mode: {t}")
+        self.data_storage.initialize_bandit(table=table, bandit_type=t, initial_params=mab.initial_parameters)
+        return mab
 
-        self.data_storage.initialize_bandit(
-            table="intervention_mab_runs", bandit_type=t, initial_params=mab.initial_parameters
+    def _init_resource_mab(self):
+        return self._init_mab("resource", RESOURCE_MAB_CONFIG, _RESOURCE_MAB_BUILDERS, "resource_mab_runs")
+
+    def _init_intervention_mab(self):
+        return self._init_mab(
+            "intervention", INTERVENTION_MAB_CONFIG, _INTERVENTION_MAB_BUILDERS, "intervention_mab_runs"
         )
-        return mab
 
     def _init_recommendation_mab(self):
-        t = RECOMMENDATION_MAB_CONFIG["type"]
-        logger.info(f"Initializing recommendation MAB with mode: {t}...")
-
-        if t == "BernoulliBetaTS":
-            kwargs = {}
-            if "alpha_0" in RECOMMENDATION_MAB_CONFIG:
-                kwargs["alpha_0"] = RECOMMENDATION_MAB_CONFIG["alpha_0"]
-            if "beta_0" in RECOMMENDATION_MAB_CONFIG:
-                kwargs["beta_0"] = RECOMMENDATION_MAB_CONFIG["beta_0"]
-            mab = BernoulliBetaTS(**kwargs)
-
-        elif t == "RecommendationOptimalBandit":
-            int_path = os.path.join(os.path.dirname(__file__), "..", "user_preferences", "int_preferences.json")
-            with open(int_path) as f:
-                intervention_pref = json.load(f)
-
-            rec_path = os.path.join(os.path.dirname(__file__), "..", "user_preferences", "rec_preferences.json")
-            with open(rec_path) as f:
-                recommendation_pref = json.load(f)
-
-            mab = RecommendationOptimalBandit(
-                intervention_pref=intervention_pref, recommendation_pref=recommendation_pref
-            )
-
-        elif t == "RandomBandit":
-            mab = RandomBandit()
-
-        else:
-            raise ValueError(f"Unknown recommendation_mab_mode: {t}")
-
-        self.data_storage.initialize_bandit(
-            table="recommendation_mab_runs", bandit_type=t, initial_params=mab.initial_parameters
+        return self._init_mab(
+            "recommendation", RECOMMENDATION_MAB_CONFIG, _RECOMMENDATION_MAB_BUILDERS, "recommendation_mab_runs"
         )
-        return mab
@@ -1,16 +1,17 @@
 import logging
+import numpy as np
 from cs_module.config import REWARD_TYPE, RECOMMENDATION_MAB_CONFIG, INTERVENTION_MAB_CONFIG, RESOURCE_MAB_CONFIG
-from cs_module.utils.feedback_handler import (
-    get_sent_recommendations,
-    get_rated_recommendations,
-    get_rated_resources,
-)
 from cs_module.utils.process_binder import ProcessBinder
-from cs_module.utils.logging_utils import pretty
+from cs_module.utils.logging_utils import lazy_pretty
 from cs_module.content_selection.feature_builders import get_mission_to_feature_vec_to_rec_ids
-from cs_module.content_selection.frequency_updaters import update_frequency_offsets
+from cs_module.content_selection.frequency_updaters import update_frequency_offsets, new_intervention_frequency_offset
 from datetime import timedelta
 
+# bandit types are fixed by the generated config for the life of the process
+_INT_MAB_TYPE = INTERVENTION_MAB_CONFIG["type"]
+_REC_MAB_TYPE = RECOMMENDATION_MAB_CONFIG["type"]
+_RES_MAB_TYPE = RESOURCE_MAB_CONFIG["type"]
+
 
 class MABUpdater:
     def __init__(
@@ -36,20 +37,63 @@ class MABUpdater:
         self.missions = missions
         self.resources = resources
         self.data_storage = data_storage
+        self._pending_updates = {}  # table -> [update dicts], written once per update_all
+        self._rec_static = {}  # rec_id -> (pillar, intervention_type, mix), see feature_builders
+        # (user_id, mission_id, sel_ts, SRc52 already had) -> (prior rec_ids, [replay state after i priors]);
+        # cleared per update_all
+        self._slot_state_cache = {}
+        self._now_iso = None  # server "now" of the running update_all, shared by its MAB update rows
+        # (event_name, content_type) -> handler; the kinds are disjoint, so each event is classified once
+        self._event_handlers = {
+            ("notification_sent", "recommendation"): self._process_sent_recommendation,
+            ("notification_rated", "recommendation"): self._process_rated_recommendation,
+            ("notification_rated", "resource"): self._process_rated_resource,
+        }
+        # REWARD_TYPE is fixed for the process: pick the rating -> reward conversion once
+        if REWARD_TYPE == "thumbs":
+            self._compute_reward = self._reward_thumbs
+        elif REWARD_TYPE == "float":
+            self._compute_reward = self._reward_float
+        else:
+            raise ValueError(f"Unknown REWARD_TYPE: {REWARD_TYPE}")
 
     def update_all(self, feedback):
+        self._now_iso = self.time_handler.utc_iso(self.time_handler.now)
+        try:
+            self._update_all(feedback)
+        finally:
+            self._slot_state_cache = {}
+            self._flush_updates()
+
+    def _queue_update(self, table, update):
+        self._pending_updates.setdefault(table, []).append(update)
+
+    def _flush_updates(self):
+        pending, self._pending_updates = self._pending_updates, {}
+        for table, updates in pending.items():
+            if table == "intervention_mab_updates":
+                self.data_storage.add_intervention_mab_updates(updates)
+            else:
+                self.data_storage.add_mab_updates(table, updates)
+
+    def _update_all(self, feedback):
         for user_id, user_feedback in feedback.items():
-            if user_id not in self.user_manager.get_all_users():
+            user = self.user_manager.get_user(user_id)
+            if user is None:
                 logging.warning(f"User {user_id} not found. Skipping.")
                 continue
 
             for event in user_feedback["events"]:
+                props = event["properties"]
+                handler = self._event_handlers.get((event["event_name"], props.get("content_type")))
+                if handler is None:
+                    continue  # e.g. opened notifications: nothing to learn
+
                 # If mission was prescribed --> do not update MABs
                 # No need to check for user level
-                mission_id = event["properties"].get("mission_id")
+                mission_id = props.get("mission_id")
                 evt_ts = self.time_handler.parse_client_ts(event["timestamp"])
 
-                user = self.user_manager.get_user(user_id)
                 snap = user.mission_snapshot_at(mission_id, evt_ts)
                 if snap is None:
                     logging.warning(
@@ -61,30 +105,44 @@ class MABUpdater:
                     # Do not learn from prescribed missions
                     continue
 
-                self._process_sent_recommendation(user_id, event)
-                self._process_rated_recommendation(user_id, event)
-                self._process_rated_resource(user_id, event)
+                handler(user_id, user, event, evt_ts)
 
     def _sent_seq_for_mission(self, user, mission_id, sel_ts):
         """Collect the actually-sent items for this mission in the 7-day plan window."""
         end_ts = sel_ts + timedelta(days=7)  # cap exactly like live planning
-        seq = []
-        for ts, pid, rid, _mix, mid in user.sent_rec_tracker.history:
-            if mid != mission_id:
-                continue
-            if not (sel_ts <= ts < end_ts):
-                continue
-            seq.append({"sent_ts": ts, "process_id": pid, "rec_id": rid})
-        seq.sort(key=lambda x: x["sent_ts"])
-        for i, ev in enumerate(seq, start=1):
-            ev["slot_index"] = i
+        sends = user.sent_rec_tracker.get_mission_sends(mission_id, sel_ts, end_ts)
+        seq = [
+            {"sent_ts": ts, "process_id": pid, "rec_id": rid, "slot_index": i}
+            for i, (ts, pid, rid) in enumerate(sends, start=1)
+        ]
         return seq
 
-    def _fv_for_slot_at_selection_time(self, user, mission_id, rec_id, seq, slot_index, prompted: bool):
-        avail = {mission_id: list(user.get_available_recommendations(mission_id))}
-        total_off, intv_off, rec_off = 0, {}, {}
-        for i in range(1, slot_index):
-            prior = seq[i - 1]["rec_id"]
+    @staticmethod
+    def _copy_slot_state(state):
+        # update_frequency_offsets mutates rec_off and the avail lists in place
+        total_off, intv_off, rec_off, avail = state
+        return total_off, intv_off.copy(), dict(rec_off), {m: list(recs) for m, recs in avail.items()}
+
+    def _state_up_to(self, user, mission_id, sel_ts, seq, slot_index):
+        """Replay state before `slot_index`, resuming from the longest cached prefix of prior sends."""
+        priors = [ev["rec_id"] for ev in seq[: slot_index - 1]]
+        # replaying SRc52 prunes it only while the user has not had it yet (and records that it has), so
+        # replays started before and after that point differ: keep their states apart
+        key = (user.user_id, mission_id, sel_ts, "SRc52" in user.only_one_rec_already)
+        cached = self._slot_state_cache.get(key)
+        if cached is None:
+            avail = {mission_id: list(user.get_available_recommendations(mission_id))}
+            cached_priors, states = [], [(0, new_intervention_frequency_offset(), {}, avail)]
+        else:
+            cached_priors, states = cached
+
+        n = 0
+        while n < len(priors) and n < len(cached_priors) and priors[n] == cached_priors[n]:
+            n += 1
+        states = states[: n + 1]
+
+        total_off, intv_off, rec_off, avail = self._copy_slot_state(states[n])
+        for prior in priors[n:]:
             _, total_off, intv_off, rec_off, avail = update_frequency_offsets(
                 sel_rec_id=prior,
                 mission_id=mission_id,
@@ -97,57 +155,71 @@ class MABUpdater:
             )
             # mirror live post-selection pruning
             avail = user.update_avail_recommendations(avail, prior)
+            states.append(self._copy_slot_state((total_off, intv_off, rec_off, avail)))
+
+        if len(priors) >= len(cached_priors) or n < len(priors):
+            self._slot_state_cache[key] = (priors, states)
+        return self._copy_slot_state(states[len(priors)])
+
+    def _fvs_for_slot_at_selection_time(self, user, mission_id, sel_ts, rec_id, seq, slot_index):
+        """Selection-time FV and its prompted/EoW twin, sharing one replay of the prior slots."""
+        total_off, intv_off, rec_off, avail = self._state_up_to(user, mission_id, sel_ts, seq, slot_index)
+
+        fv = self._fv_for_rec(user, mission_id, rec_id, avail, total_off, intv_off, rec_off, prompted=False)
 
         # 🔴 key: for prompted/EoW we also count THIS item (like live does)
-        if prompted:
-            _, total_off, intv_off, rec_off, avail = update_frequency_offsets(
-                sel_rec_id=rec_id,
-                mission_id=mission_id,
-                mission_to_selected_rec_to_count={},
-                total_freq_offset=total_off,
-                intv_to_freq_offset=intv_off,
-                rec_to_freq_offset=rec_off,
-                mission_to_available_recs=avail,
-                recommendations=self.recommendations,
-            )
-            avail = user.update_avail_recommendations(avail, rec_id)
+        _, total_off, intv_off, rec_off, avail = update_frequency_offsets(
+            sel_rec_id=rec_id,
+            mission_id=mission_id,
+            mission_to_selected_rec_to_count={},
+            total_freq_offset=total_off,
+            intv_to_freq_offset=intv_off,
+            rec_to_freq_offset=rec_off,
+            mission_to_available_recs=avail,
+            recommendations=self.recommendations,
+        )
+        avail = user.update_avail_recommendations(avail, rec_id)
+
+        fv_prompted = self._fv_for_rec(user, mission_id, rec_id, avail, total_off, intv_off, rec_off, prompted=True)
+        return fv, fv_prompted
 
+    def _fv_for_rec(self, user, mission_id, rec_id, avail, total_off, intv_off, rec_off, prompted: bool):
+        # Only rec_id's FV is needed, and it does not depend on the other available recs
+        if rec_id not in avail.get(mission_id, ()):
+            return None
         fv_map = get_mission_to_feature_vec_to_rec_ids(
             user=user,
             missions=self.missions,
             recommendations=self.recommendations,
-            mission_id_to_avail_rec_ids=avail,
+            mission_id_to_avail_rec_ids={mission_id: [rec_id]},
             total_freq_offset=total_off,
             intv_to_freq_offset=intv_off,
             rec_to_freq_offset=rec_off,
             prompted=prompted,
+            rec_static=self._rec_static,
         ).get(mission_id, {})
-        for key_fv, rec_ids in fv_map.items():
-            if rec_id in rec_ids:
-                try:
-                    return [float(x) for x in key_fv]
-                except Exception:
-                    return None
+        for key_fv in fv_map:
+            try:
+                # cast in C; keep a list of Python floats for the binder, psycopg2 and JSON output
+                return np.asarray(key_fv, dtype=np.float64).tolist()
+            except (TypeError, ValueError):
+                return None
         return None
 
-    def _process_sent_recommendation(self, user_id, event):
-        if not get_sent_recommendations([event]):
-            return
-
-        rec_id = event["properties"]["content_id"]
+    def _process_sent_recommendation(self, user_id, user, event, ts):
+        props = event["properties"]
+        rec_id = props["content_id"]
         if rec_id not in self.recommendations:
             logging.warning(f"Unknown recommendation ID {rec_id}")
             return
-        mission_id = event["properties"].get("mission_id")
+        mission_id = props.get("mission_id")
         process_id = event["process_id"]
 
-        user = self.user_manager.get_user(user_id)
-        ts = self.time_handler.parse_client_ts(event["timestamp"])
         intervention = self.recommendations[rec_id]["intervention_type"]
-        user.track_sent_recommendations(ts, event["process_id"], rec_id, intervention, mission_id)
+        user.track_sent_recommendations(ts, process_id, rec_id, intervention, mission_id)
 
         # Try normal binder bind first
-        plan_id = user.current_recommendation_plan.get("plan_id") or self._safe_plan_id_fallback(user_id)
+        plan_id = user.current_recommendation_plan.get("plan_id") or self._safe_plan_id_fallback(user)
         snap = self.binder.bind_on_sent(user_id, plan_id, rec_id, mission_id, process_id)
 
         if snap is not None:
@@ -163,55 +235,49 @@ class MABUpdater:
         sel_ts = snap_mission["selection_timestamp"]
         seq = self._sent_seq_for_mission(user, mission_id, sel_ts)
 
-        # slot index of THIS send (prefer exact process_id)
-        slot_index = next((ev["slot_index"] for ev in seq if ev["process_id"] == process_id), None)
+        # slot index of THIS send (prefer exact process_id), in one pass over seq
+        slot_index = fallback_index = None
+        for ev in seq:
+            if ev["process_id"] == process_id:
+                slot_index = ev["slot_index"]
+                break
+            if fallback_index is None and ev["rec_id"] == rec_id and ev["sent_ts"] == ts:
+                # fallback: first event at same timestamp & rec_id
+                fallback_index = ev["slot_index"]
         if slot_index is None:
-            # fallback: first event at same timestamp & rec_id
-            slot_index = next((ev["slot_index"] for ev in seq if ev["rec_id"] == rec_id and ev["sent_ts"] == ts), None)
+            slot_index = fallback_index
 
         if slot_index is None:
             # still bind a minimal snapshot so rating lookups won’t crash
             self.binder.set_snapshot(process_id, rec_id=rec_id, mission_id=mission_id, feature_vector=None)
             return
 
-        fv = self._fv_for_slot_at_selection_time(
+        fv, fv_prompted = self._fvs_for_slot_at_selection_time(
             user=user,
             mission_id=mission_id,
+            sel_ts=sel_ts,
             rec_id=rec_id,
             seq=seq,
             slot_index=slot_index,
-            prompted=False,
         )
         self.binder.set_snapshot(process_id, rec_id=rec_id, mission_id=mission_id, feature_vector=fv)
 
-        # Also precompute the EoW/prompted FV now, so if a prompted rating arrives later we have it.
-        fv_prompted = self._fv_for_slot_at_selection_time(
-            user=user,
-            mission_id=mission_id,
-            rec_id=rec_id,
-            seq=seq,
-            slot_index=slot_index,
-            prompted=True,  # <— key: prompted=True for end-of-week context
-        )
+        # Also keep the EoW/prompted FV now, so if a prompted rating arrives later we have it.
         if fv_prompted is not None:
             user.eow_rec_id_to_fv[rec_id] = fv_prompted
 
-    def _process_rated_recommendation(self, user_id, event):
-        if not get_rated_recommendations([event]):
-            return
-        logging.info("Updating %s MABs with event:\n%s", user_id, pretty(event))
-        user = self.user_manager.get_user(user_id)
-        rating = event["properties"]["rating"]
-        reward = self._compute_reward(rating)
+    def _process_rated_recommendation(self, user_id, user, event, ts):
+        logging.info("Updating %s MABs with event:\n%s", user_id, lazy_pretty(event))
         process_id = event["process_id"]
 
         # From the event (fallbacks)
-        event_rec_id = event["properties"].get("content_id")
-        event_mission_id = event["properties"].get("mission_id")
+        props = event["properties"]
+        event_rec_id = props.get("content_id")
+        event_mission_id = props.get("mission_id")
 
-        if event.get("properties", {}).get("is_end_misison", True):
+        if props.get("is_end_misison", True):
             logging.info(f"End of mission feedback ({event_rec_id})")
-            eow_rec_id_to_fv = self.user_manager.get_user(user_id).eow_rec_id_to_fv
+            eow_rec_id_to_fv = user.eow_rec_id_to_fv
             rec_id = event_rec_id
             mission_id = event_mission_id
 
@@ -238,7 +304,7 @@ class MABUpdater:
                 if snap is None:
                     logging.warning(
                         f"No binder snapshot found for process_id={process_id}, "
-                        f"user_id={user_id}, event_rec_id={event.get('properties', {}).get('content_id')}."
+                        f"user_id={user_id}, event_rec_id={event_rec_id}."
                     )
                     return
             except Exception as e:
@@ -258,12 +324,13 @@ class MABUpdater:
                     f"Binder rec_id ({rec_id}) != event content_id ({event_rec_id}); trusting binder snapshot."
                 )
 
-        ts = self.time_handler.parse_client_ts(event["timestamp"])
-        is_eow = bool(event["properties"].get("is_end_misison", False))
+        # the reward is only needed once the event has passed the checks above
+        reward = self._compute_reward(props["rating"])
+        is_eow = bool(props.get("is_end_misison", False))
         user.track_rating(ts, rec_id, is_eow)
 
         # If intervention bandit disabled, just update recommendation bandit
-        t = INTERVENTION_MAB_CONFIG["type"]
+        t = _INT_MAB_TYPE
         if t == "None":
             self._update_recommendation_mab(rec_id, user, reward, process_id)
             return
@@ -274,7 +341,7 @@ class MABUpdater:
         else:
             raise ValueError(f"Unknown intervention_mab_mode: {t}")
 
-        timestamp = self.time_handler.utc_iso(self.time_handler.now)
+        timestamp = self._now_iso
         update = {
             "user_id": user_id,
             "timestamp": timestamp,
@@ -284,12 +351,12 @@ class MABUpdater:
             "params": params,
         }
 
-        self.data_storage.add_intervention_mab_update(update=update)
+        self._queue_update("intervention_mab_updates", update)
         self.binder.release(process_id)
         self._update_recommendation_mab(rec_id, user, reward, process_id)
 
     def _update_recommendation_mab(self, rec_id, user, reward, process_id):
-        t = RECOMMENDATION_MAB_CONFIG["type"]
+        t = _REC_MAB_TYPE
 
         if t == "BernoulliBetaTS":
             params = self.recommendation_mab.update(rec_id, reward)
@@ -301,7 +368,7 @@ class MABUpdater:
         else:
             raise ValueError(f"Unknown recommendation_mab_mode: {t}")
 
-        timestamp = self.time_handler.utc_iso(self.time_handler.now)
+        timestamp = self._now_iso
         update = {
             "user_id": user.user_id,
             "timestamp": timestamp,
@@ -309,24 +376,23 @@ class MABUpdater:
             "reward": reward,
             "params": params,
         }
-        self.data_storage.add_mab_update(table="recommendation_mab_updates", update=update)
+        self._queue_update("recommendation_mab_updates", update)
 
-    def _process_rated_resource(self, user_id, event):
-        if not get_rated_resources([event]):
-            return
+    def _process_rated_resource(self, user_id, user, event, ts):
         logging.info(f"Updating {user_id} MABs with event: {event}")
 
-        res_id = event["properties"]["content_id"]
+        props = event["properties"]
+        res_id = props["content_id"]
 
         if res_id not in self.resources:
             logging.warning(f"Unknown resource ID {res_id}")
             return
 
-        if event["properties"].get("is_end_misison"):
+        if props.get("is_end_misison"):
             logging.info(f"End of mission feedback ({res_id})")
 
-        reward = self._compute_reward(event["properties"]["rating"])
-        t = RESOURCE_MAB_CONFIG["type"]
+        reward = self._compute_reward(props["rating"])
+        t = _RES_MAB_TYPE
 
         if t == "BernoulliBetaTS":
             params = self.resource_mab.update(res_id, reward)
@@ -337,7 +403,7 @@ class MABUpdater:
         else:
             raise ValueError(f"Unknown resource_mab_mode: {t}")
 
-        timestamp = self.time_handler.utc_iso(self.time_handler.now)
+        timestamp = self._now_iso
         process_id = event["process_id"]
         update = {
             "user_id": user_id,
@@ -347,19 +413,19 @@ class MABUpdater:
             "params": params,
         }
 
-        self.data_storage.add_mab_update(table="resource_mab_updates", update=update)
+        self._queue_update("resource_mab_updates", update)
 
         logging.info(f"Updated resource MAB for {res_id}.")
 
-    def _compute_reward(self, rating):
-        if REWARD_TYPE == "thumbs":
-            return 1 if rating == "liked" else 0
-        elif REWARD_TYPE == "float":
-            return float(rating)
-        raise ValueError(f"Unknown REWARD_TYPE: {REWARD_TYPE}")
+    @staticmethod
+    def _reward_thumbs(rating):
+        return 1 if rating == "liked" else 0
+
+    @staticmethod
+    def _reward_float(rating):
+        return float(rating)
 
-    def _safe_plan_id_fallback(self, user_id):
-        user = self.user_manager.get_user(user_id)
+    def _safe_plan_id_fallback(self, user):
         # prefer current plan if present
         pid = user.current_recommendation_plan.get("plan_id") if user.current_recommendation_plan else None
         if pid:
@@ -1,8 +1,14 @@
+from itertools import chain
 from cs_module.config import (
     RECOMMENDATION_MAB_CONFIG,
     INTERVENTION_MAB_CONFIG,
 )
 
+SRC52 = "SRc52"
+# bandit types are fixed by the generated config for the life of the process
+_INT_MAB_TYPE = INTERVENTION_MAB_CONFIG["type"]
+_REC_MAB_TYPE = RECOMMENDATION_MAB_CONFIG["type"]
+
 
 def select_recommendation(
     feature_vec_to_rec_ids,
@@ -17,24 +23,24 @@ def select_recommendation(
     if not feature_vec_to_rec_ids:  # Some missions have no rec (e.g., EM88), or no more available
         return None, None
 
-    cfg = INTERVENTION_MAB_CONFIG["type"]
+    cfg = _INT_MAB_TYPE
 
     """    
     SRc52: This recommendation must appear only once during the intervention but is mandatory.
     --> first one to be selected if not already
     """
-    fv_with_s52 = next((fv for fv, ids in feature_vec_to_rec_ids.items() if "SRc52" in ids), None)
+    fv_with_s52 = next((fv for fv, ids in feature_vec_to_rec_ids.items() if SRC52 in ids), None)
     if fv_with_s52 is not None:
-        if "SRc52" not in user.only_one_rec_already:
-            feature_vec_to_rec_ids = {fv_with_s52: ["SRc52"]}
+        if SRC52 not in user.only_one_rec_already:
+            feature_vec_to_rec_ids = {fv_with_s52: [SRC52]}
         else:
-            # remove SRc52 cleanly without mutating during iteration
-            new_map = {}
-            for fv, ids in feature_vec_to_rec_ids.items():
-                new_ids = [rid for rid in ids if rid != "SRc52"]
-                if new_ids:
-                    new_map[fv] = new_ids
-            feature_vec_to_rec_ids = new_map
+            # a rec id maps to a single fv: rebuild only that entry, on a shallow copy of the caller's map
+            ids = [rid for rid in feature_vec_to_rec_ids[fv_with_s52] if rid != SRC52]
+            feature_vec_to_rec_ids = dict(feature_vec_to_rec_ids)
+            if ids:
+                feature_vec_to_rec_ids[fv_with_s52] = ids
+            else:
+                del feature_vec_to_rec_ids[fv_with_s52]
 
     if cfg == "None":
         return handle_recommendation_mab_only(
@@ -57,12 +63,12 @@ def select_recommendation(
 def handle_recommendation_mab_only(
     user, feature_vec_to_rec_ids, recommendation_mab, data_storage, time_handler, select_anyway, selection_id
 ):
-    rec_cfg = RECOMMENDATION_MAB_CONFIG["type"]
-    rec_ids = [rid for fv in feature_vec_to_rec_ids for rid in feature_vec_to_rec_ids[fv]]
+    rec_cfg = _REC_MAB_TYPE
+    rec_ids = list(chain.from_iterable(feature_vec_to_rec_ids.values()))
 
     if rec_cfg == "RecommendationOptimalBandit":
         sel, sampled = recommendation_mab.select_action(
-            [feature_vec_to_rec_ids[fv] for fv in feature_vec_to_rec_ids], list(feature_vec_to_rec_ids)
+            list(feature_vec_to_rec_ids.values()), list(feature_vec_to_rec_ids)
         )
     elif rec_cfg == "RandomBandit":
         sel, sampled = recommendation_mab.select_action(rec_ids)
@@ -100,7 +106,7 @@ def handle_intervention_mab(
 
     if cfg == "LogisticLaplaceTS":
         selected_rec_ids, selected_feature_vector, sampled = intervention_mab.select_action(
-            [feature_vec_to_rec_ids[fv] for fv in fvs], fvs
+            list(feature_vec_to_rec_ids.values()), fvs
         )
         if not select_anyway and sampled["estimated_reward"] <= 0.5:
             return None, None
@@ -131,7 +137,7 @@ def handle_intervention_mab(
 
 
 def handle_recommendation_mab(user, rec_ids, recommendation_mab, data_storage, time_handler, selection_id):
-    rec_cfg = RECOMMENDATION_MAB_CONFIG["type"]
+    rec_cfg = _REC_MAB_TYPE
 
     if rec_cfg == "BernoulliBetaTS":
         sel, sampled = recommendation_mab.select_action(rec_ids)
@@ -153,26 +159,26 @@ def handle_recommendation_mab(user, rec_ids, recommendation_mab, data_storage, t
 
 def select_resource(user, resource_mab, data_storage, time_handler, selection_id):
     selected_resources = []
-    content_count = 0
+    samples = []  # written in one batch once every mission has its resource
+    timestamp = time_handler.utc_iso(time_handler.now)
     for mission in user.get_new_missions():
-        rids = [r for r in mission.get("resources", []) if r not in user.get_received_resources()]
+        rids = [r for r in mission.get("resources", []) if not user.has_received_resource(r)]
 
         if not rids:
             continue
 
         sel, sampled = resource_mab.select_action(rids)
-        data_storage.add_mab_sample(
-            table="resource_mab_samples",
-            record={
+        samples.append(
+            {
                 "user_id": user.user_id,
                 "plan_id": selection_id["plan_id"],
-                "content_count": content_count,
-                "timestamp": time_handler.utc_iso(time_handler.now),
+                "content_count": len(samples),
+                "timestamp": timestamp,
                 "sample": sampled,
-            },
+            }
         )
         selected_resources.append({"id": sel, "type": "resource", "mission_id": mission["mission"]})
         user.add_received_resource(sel)  # Assuming it will receive this resource
-        content_count += 1
 
+    data_storage.add_mab_samples("resource_mab_samples", samples)
     return selected_resources
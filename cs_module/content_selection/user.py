@@ -1,21 +1,42 @@
 from dataclasses import dataclass, field
-from typing import List, Dict, Tuple, Any, Optional
-from datetime import datetime
+from typing import Iterable, List, Dict, Set, Tuple, Any, Optional
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
 from cs_module.utils.recommendation_history_tracker import RecommendationHistoryTracker
 from cs_module.services.time_handler import TimeHandler
 from cs_module.config import MAX_NUM_REC_PER_MISSION, PILLARS
-from cs_module.utils.encoding import get_intervention_encoding
+from cs_module.content_selection.frequency_updaters import get_intervention_mix
 import logging
 
 
 def _to_float_or_none(x):
+    if x is None:
+        return None
+    if type(x) is float:
+        return x
     try:
         return float(x)
-    except Exception:
+    except (TypeError, ValueError, OverflowError):
         return None
 
 
-@dataclass
+_WINTER_MONTHS = (12, 1, 2)
+_SPRING_MONTHS = (3, 4, 5)
+# month -> seasonal recommendations that are not available in that month
+_OFF_SEASON_RECS = {
+    month: frozenset(
+        (() if month in _WINTER_MONTHS else ("ERc65", "ERc66")) + (() if month in _SPRING_MONTHS else ("ERc110",))
+    )
+    for month in range(1, 13)
+}
+
+
+_PILLAR_SET = frozenset(PILLARS)
+_HHS_SPECIAL_KEYS = frozenset(("components", "emotional_distress"))  # handled after the pillar scores
+_CONSTRAINED_RECS = frozenset(("SRc52", "SRc100", "SRc101"))  # see update_avail_recommendations
+
+
+@dataclass(slots=True)
 class User:
     user_id: str
     time_handler: TimeHandler
@@ -29,6 +50,11 @@ class User:
     new_plan_required: bool = field(default=False)
 
     selected_missions_and_contents: List[Dict] = field(default_factory=list)
+    # mission_id -> [(parsed selection_timestamp or None, record)] in selection order; the records are the dicts
+    # in selected_missions_and_contents, so the parsed timestamp is kept here rather than added to them
+    _missions_by_id: Dict[str, List[Tuple[Optional[datetime], Dict]]] = field(
+        default_factory=dict, init=False, repr=False
+    )
     selected_contents: Dict[str, Any] = field(default_factory=dict)
     current_recommendation_plan: Dict[str, Any] = field(default_factory=dict)
 
@@ -42,23 +68,38 @@ class User:
     past_week_rec_to_frequency: Dict[str, int] = field(default_factory=dict)
 
     received_resources: List[str] = field(default_factory=list)
+    _received_resource_set: Set[str] = field(default_factory=set, init=False, repr=False)  # membership for the above
 
     only_one_rec_already: List[str] = field(default_factory=list)
 
     eow_rec_id_to_fv: Dict[str, Any] = field(default_factory=dict)
     rating_history: List[Tuple[datetime, str, bool]] = field(default_factory=list)
+    # sorted timestamps of the voluntary (not end-of-mission) entries of rating_history
+    _voluntary_rating_ts: List[datetime] = field(default_factory=list, init=False, repr=False)
 
-    previous_mission_score = 0
+    previous_mission_score: float = 0
+
+    # filled by _rebuild_plan_indexes when a plan is saved; declared so they get a slot
+    rec_plan_to_position: Dict[Tuple[str, str], int] = field(default_factory=dict)
+    rec_plan_to_frequency: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._received_resource_set.update(self.received_resources)
+        self._voluntary_rating_ts = sorted(ts for ts, _, is_prompted in self.rating_history if not is_prompted)
 
     def add_received_resource(self, resource_id: str):
         """Add a resource to the list of received resources."""
-        if resource_id not in self.received_resources:
+        if resource_id not in self._received_resource_set:
+            self._received_resource_set.add(resource_id)
             self.received_resources.append(resource_id)
 
     def get_received_resources(self) -> List[str]:
         """Get the list of received resources."""
         return self.received_resources
 
+    def has_received_resource(self, resource_id: str) -> bool:
+        return resource_id in self._received_resource_set
+
     def disable(self):
         self.active = False
 
@@ -73,16 +114,19 @@ class User:
             logging.warning("HHS payload not a dict: %r", hhs)
             return
 
+        to_float = _to_float_or_none
+        hha = self.health_habit_assessment
+
         # 1) Main pillar scores
         for key, value in hhs.items():
-            if key in ("components", "emotional_distress"):
+            if key in _HHS_SPECIAL_KEYS:
                 continue
-            if key in PILLARS:
-                fv = _to_float_or_none(value)
+            if key in _PILLAR_SET:
+                fv = to_float(value)
                 if fv is None:
                     logging.warning("Pillar %s has non-numeric value %r; skipping.", key, value)
                 else:
-                    self.health_habit_assessment[key] = fv
+                    hha[key] = fv
             else:
                 logging.warning("Unknown HHS key %r (value=%r); ignoring.", key, value)
 
@@ -97,32 +141,29 @@ class User:
                 logging.warning("Received 'components' without nutrition/emotional_wellbeing key; skipping components.")
             if target_pillar:
                 comp_key = f"{target_pillar}_components"
-                if comp_key not in self.health_habit_assessment or not isinstance(
-                    self.health_habit_assessment.get(comp_key), dict
-                ):
-                    self.health_habit_assessment[comp_key] = {}
+                existing = hha.get(comp_key)
+                if not isinstance(existing, dict):
+                    existing = hha[comp_key] = {}
                 for cname, cval in (hhs["components"] or {}).items():
-                    fv = _to_float_or_none(cval)
+                    fv = to_float(cval)
                     if fv is None:
                         logging.warning(
                             "Component %s.%s has non-numeric value %r; skipping.", target_pillar, cname, cval
                         )
                         continue
                     # overwrite or add
-                    self.health_habit_assessment[comp_key][cname] = fv
+                    existing[cname] = fv
 
         # 3) Bi-weekly emotional_distress → update emotional_wellbeing_components
         if "emotional_distress" in hhs:
-            fv = _to_float_or_none(hhs["emotional_distress"])
+            fv = to_float(hhs["emotional_distress"])
             if fv is None:
                 logging.warning("emotional_distress has non-numeric value %r; skipping.", hhs["emotional_distress"])
             else:
-                ew_key = "emotional_wellbeing_components"
-                if ew_key not in self.health_habit_assessment or not isinstance(
-                    self.health_habit_assessment.get(ew_key), dict
-                ):
-                    self.health_habit_assessment[ew_key] = {}
-                self.health_habit_assessment[ew_key]["emotional_distress"] = fv
+                ew_components = hha.get("emotional_wellbeing_components")
+                if not isinstance(ew_components, dict):
+                    ew_components = hha["emotional_wellbeing_components"] = {}
+                ew_components["emotional_distress"] = fv
 
     def get_hhs(self):
         return self.health_habit_assessment
@@ -133,20 +174,29 @@ class User:
             return int((self.time_handler.now - self.intervention_start_date).days)
         return None
 
-    def set_missions_plan_to_false(self, mission_ids: list):
+    def set_missions_plan_to_false(self, mission_ids: Iterable[str]):
         """Set the mission plan to false for a given mission ID."""
-        for mission in self.selected_missions_and_contents:
-            if mission["mission"] in mission_ids:  # same mission might have been selected multiple times... no problem
+        mission_id_set = mission_ids if isinstance(mission_ids, (set, frozenset)) else set(mission_ids)
+        for mission_id in mission_id_set:
+            # same mission might have been selected multiple times... no problem
+            for _, mission in self._missions_by_id.get(mission_id, ()):
                 mission["plan_required"] = False
 
     def update_missions_and_contents(self, missions_and_contents: Dict[str, Any]):
         for mission in missions_and_contents.get("new_missions", []):
             mission["plan_required"] = True
             self.selected_missions_and_contents.append(mission)
+            try:
+                sel_ts = self.time_handler.parse_client_ts(mission.get("selection_timestamp"))
+            except Exception:
+                sel_ts = None  # never matched by mission_snapshot_at
+            self._missions_by_id.setdefault(mission["mission"], []).append((sel_ts, mission))
 
             if not self.missions_started:
                 self.missions_started = True
-                self.intervention_start_date = self.time_handler.parse_client_ts(mission["selection_timestamp"])
+                self.intervention_start_date = (
+                    sel_ts if sel_ts is not None else self.time_handler.parse_client_ts(mission["selection_timestamp"])
+                )
 
         self.new_plan_required = True
 
@@ -157,15 +207,18 @@ class User:
                 new_missions.append(mission)
         return new_missions
 
+    def _current_month(self) -> int:
+        """Month of the time handler's clock (wall clock if it has none set)."""
+        now = self.time_handler.now
+        return (now or datetime.now()).month
+
     def is_winter(self) -> bool:
         """Return True if it's winter (Dec–Feb) in the Northern Hemisphere."""
-        now = getattr(self.time_handler, "now", None) or datetime.now()
-        return now.month in (12, 1, 2)
+        return self._current_month() in _WINTER_MONTHS
 
     def is_spring(self) -> bool:
         """Return True if it's spring (Mar–May) in the Northern Hemisphere."""
-        now = getattr(self.time_handler, "now", None) or datetime.now()
-        return now.month in (3, 4, 5)
+        return self._current_month() in _SPRING_MONTHS
 
     def get_available_recommendations(self, mission_id: str) -> List[str]:
         """Get available contents for a given mission.
@@ -173,53 +226,53 @@ class User:
         ERc110: Spring season
         """
 
-        for mission in self.selected_missions_and_contents:
-            if mission["mission"] == mission_id:
-                recommendations = list(mission["recommendations"])
-
-                if "ERc65" in recommendations and not self.is_winter():
-                    recommendations.remove("ERc65")
-
-                if "ERc66" in recommendations and not self.is_winter():
-                    recommendations.remove("ERc66")
-
-                if "ERc110" in recommendations and not self.is_spring():
-                    recommendations.remove("ERc110")
-
-                return recommendations
-        return []
+        records = self._missions_by_id.get(mission_id)
+        if not records:
+            return []
+        blocked = _OFF_SEASON_RECS[self._current_month()]
+        return [r for r in records[0][1]["recommendations"] if r not in blocked]
 
     def save_recommendation_plan(self, recommendation_plan: Dict[str, Any]):
         """Save the computed weekly recommendation plan to the dataclass instance."""
         self.current_recommendation_plan = recommendation_plan
         self.new_plan_required = False
+        self._rebuild_plan_indexes()
 
-    def update_rec_plan_to_position(self):
-        """Update the recommendation plan to position mapping."""
-        rec_plan_to_position_temp = {}
-        self.rec_plan_to_position = {}
+    def _rebuild_plan_indexes(self):
+        """Rebuild the position and frequency mappings in a single pass over the plan.
 
-        contents = self.current_recommendation_plan.get("plans", [])  # Extract contents
+        Plan entries are the OMI ones ({"content_id", "type", "mission_id", "scheduled_for"});
+        entries without a content_id or scheduled_for are skipped.
+        """
+        rec_plan_to_position = {}
+        rec_plan_to_frequency = {}
+
+        contents = (self.current_recommendation_plan or {}).get("plans") or []  # Extract contents
 
         for content in contents:
-            if content["type"] == "recommendation":  # Check if the content is a recommendation
-                rec_plan_to_position_temp[content["id"]] = rec_plan_to_position_temp.get(content["id"], 0) + 1
-                self.rec_plan_to_position[(content["send_timestamp"], content["id"])] = rec_plan_to_position_temp[
-                    content["id"]
-                ]
+            if content.get("type") != "recommendation":  # Check if the content is a recommendation
+                continue
+            rec_id = content.get("content_id")
+            scheduled_for = content.get("scheduled_for")
+            if rec_id is None or scheduled_for is None:
+                continue
+            count = rec_plan_to_frequency.get(rec_id, 0) + 1
+            rec_plan_to_frequency[rec_id] = count
+            rec_plan_to_position[(scheduled_for, rec_id)] = count
 
-    def update_rec_plan_to_frequency(self):
-        """Update the recommendation plan to frequency mapping."""
-        self.rec_plan_to_frequency = {}
+        self.rec_plan_to_position = rec_plan_to_position
+        self.rec_plan_to_frequency = rec_plan_to_frequency
 
-        contents = self.current_recommendation_plan.get("plans", [])  # Extract contents
+    def update_rec_plan_to_position(self):
+        """Update the recommendation plan to position mapping."""
+        self._rebuild_plan_indexes()
 
-        for content in contents:
-            if content["type"] == "recommendation":  # Check if the content is a recommendation
-                self.rec_plan_to_frequency[content["id"]] = self.rec_plan_to_frequency.get(content["id"], 0) + 1
+    def update_rec_plan_to_frequency(self):
+        """Update the recommendation plan to frequency mapping."""
+        self._rebuild_plan_indexes()
 
     def get_sample_feedback_position(self, sample_feedback: Tuple[str, str]) -> int:
-        """Get the position of the sample feedback in the recommendation plan."""
+        """Get the position of the sample feedback, a (scheduled_for, content_id) pair, in the recommendation plan."""
         return self.rec_plan_to_position[sample_feedback]
 
     def get_sample_feedback_frequency(self, sample_feedback: str) -> int:
@@ -231,19 +284,16 @@ class User:
         for feedback in availability_feedback:
             if feedback["type"] == "recommendation":
                 ts = self.time_handler.parse_client_ts(feedback["sent_timestamp"])
-                self.recommendation_open_history.setdefault(feedback["content_id"], []).append(ts)
+                # kept sorted so the sliding frequency is a bisect
+                insort(self.recommendation_open_history.setdefault(feedback["content_id"], []), ts)
 
     def get_recommendation_sliding_frequency(self, content_id, timestamp, sliding_window=7) -> int:
         """Get the sliding frequency of the recommendation."""
         rec_history = self.recommendation_open_history.get(content_id, [])
 
-        filtered_history = [
-            rec_timestamp for rec_timestamp in rec_history if (timestamp - rec_timestamp).days <= sliding_window
-        ]
-
-        # Here we just return the length of the filtered history
-        sliding_frequency = len(filtered_history)
-        return sliding_frequency
+        # (timestamp - t).days <= sliding_window  <=>  t > timestamp - (sliding_window + 1) days
+        cutoff = timestamp - timedelta(days=sliding_window + 1)
+        return len(rec_history) - bisect_right(rec_history, cutoff)
 
     def track_sent_recommendations(self, timestamp, process_id, rec_id, intervention_type, mission_id):
         self.sent_rec_tracker.add_recommendation(timestamp, process_id, rec_id, intervention_type, mission_id)
@@ -265,9 +315,9 @@ class User:
         """
         if not intervention_type:
             return 0.0
-        item_mix = get_intervention_encoding(intervention_type)  # len 8
-        type_counts = self.sent_rec_tracker.get_type_counters(time_window=time_window)  # len 8 floats
-        burden = sum(w * c for w, c in zip(item_mix, type_counts))
+        item_mix = get_intervention_mix(intervention_type)  # len 8, cached read-only array
+        type_counts = self.sent_rec_tracker.get_type_counters(time_window=time_window)  # len 8 ndarray
+        burden = float(item_mix @ type_counts)
         return burden / float(MAX_NUM_REC_PER_MISSION)
 
     """
@@ -276,6 +326,8 @@ class User:
     """
 
     def update_avail_recommendations(self, mission_to_recommendations, sel_rec_id):
+        if sel_rec_id not in _CONSTRAINED_RECS:
+            return mission_to_recommendations  # nothing to prune; the lists are left as they are
         for mission, recs in mission_to_recommendations.items():
             # SRc52 appears only once in the intervention
             if sel_rec_id == "SRc52" and sel_rec_id in recs and "SRc52" not in self.only_one_rec_already:
@@ -295,6 +347,8 @@ class User:
     # called from your updater when a rating arrives
     def track_rating(self, timestamp: datetime, rec_id: str, is_end_misison: bool):
         self.rating_history.append((timestamp, rec_id, bool(is_end_misison)))
+        if not is_end_misison:
+            insort(self._voluntary_rating_ts, timestamp)
 
     def get_engagement_rate(self, time_window=None) -> float:
         """
@@ -310,11 +364,11 @@ class User:
             return 0.0
 
         # numerator: # voluntary ratings (exclude end-of-week prompted)
-        vol = sum(
-            1
-            for ts, rid, is_prompted in self.rating_history
-            if (time_window is None or (time_window[0] <= ts < time_window[1])) and not is_prompted
-        )
+        vol_ts = self._voluntary_rating_ts
+        if time_window is None:
+            vol = len(vol_ts)
+        else:
+            vol = max(0, bisect_left(vol_ts, time_window[1]) - bisect_left(vol_ts, time_window[0]))
         return max(0.0, min(1.0, vol / sent))
 
     def set_previous_mission_score(self, score):
@@ -330,12 +384,8 @@ class User:
         """
         best = None
         best_sel = None
-        for rec in self.selected_missions_and_contents:
-            if rec.get("mission") != mission_id:
-                continue
-            try:
-                sel_ts = self.time_handler.parse_client_ts(rec.get("selection_timestamp"))
-            except Exception:
+        for sel_ts, rec in self._missions_by_id.get(mission_id, ()):
+            if sel_ts is None:
                 continue
             if sel_ts <= ts and (best_sel is None or sel_ts > best_sel):
                 best, best_sel = rec, sel_ts
@@ -9,11 +9,17 @@ class UserManager:
     def __init__(self, time_handler):
         self.time_handler = time_handler
         self.users = {}
-        self.active_user_ids = []
+        self.active_user_ids = {}  # insertion-ordered set: user_id -> None
+        self._user_order = {}  # user_id -> registration index (= position in self.users)
+        self._plan_candidates = set()  # users that may have new_plan_required=True
 
     def get_all_users(self):
         return self.users
 
+    def known_user_ids(self):
+        """Live view of registered user ids; O(1) membership without copying."""
+        return self.users.keys()
+
     def get_user(self, user_id):
         return self.users.get(user_id)
 
@@ -36,23 +42,35 @@ class UserManager:
                     enrol_dt.isoformat(),
                 )
 
-            # Create/refresh in-memory user
+            # Create/refresh in-memory user (a fresh User has no plan pending)
+            self._user_order.setdefault(user_id, len(self._user_order))
+            self._plan_candidates.discard(user_id)
             self.users[user_id] = User(
                 user_id=user_id,
                 time_handler=self.time_handler,
                 personal_data=data,  # keep ISO string in dict
                 intervention_start_date=enrol_dt,  # datetime for computations
             )
-            if user_id not in self.active_user_ids:
-                self.active_user_ids.append(user_id)
+            self.active_user_ids.setdefault(user_id, None)
+
+    def get_users_needing_plan(self):
+        """(user_id, user) pairs with new_plan_required, in registration order (same as get_all_users)."""
+        pending = []
+        for user_id in sorted(self._plan_candidates, key=self._user_order.__getitem__):
+            user = self.users[user_id]
+            if user.new_plan_required:
+                pending.append((user_id, user))
+            else:
+                self._plan_candidates.discard(user_id)  # plan done since; drop lazily
+        return pending
 
     def get_active_user_ids(self):
-        return self.active_user_ids
+        return list(self.active_user_ids)
 
     def disable_users(self, disabled_users):
         for user_id in disabled_users:
             if user_id in self.active_user_ids:
-                self.active_user_ids.remove(user_id)
+                del self.active_user_ids[user_id]
                 self.users[user_id].disable()
 
     def update_escalation_levels(self, escalation_levels):
@@ -115,6 +133,7 @@ class UserManager:
             user = self.get_user(user_id)
             if user:
                 user.update_missions_and_contents(missions_and_contents)
+                self._plan_candidates.add(user_id)
             else:
                 logging.warning(f"User {user_id} not found for mission update.")
 
@@ -137,6 +156,7 @@ class UserManager:
         # appends to selected_missions_and_contents, sets intervention_start_date
         # on first mission, and flips new_plan_required=True.
         user.update_missions_and_contents({"new_missions": [mission]})
+        self._plan_candidates.add(user_id)
 
     # NEW: single-event primitive — apply one "mission accomplished"
     def apply_mission_accomplished(self, user_id: str, mission_id: str, score: float | int) -> None:
@@ -1,11 +1,19 @@
 import logging
 import json
 from flask import Flask, jsonify, request
+from flask.json.provider import DefaultJSONProvider
 from cs_module.content_selection.core import ContentSelection
 from cs_module.services.time_handler import TimeHandler
 from cs_module.config import USE_REAL_TIME
 
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:  # optional: faster (de)serialization of request/response bodies; Flask's stdlib json otherwise
+    import orjson
+except ImportError:
+    orjson = None
 
 # ---- Setup Logging ----
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s", force=True)
@@ -18,7 +26,23 @@ logging.getLogger("werkzeug").setLevel(logging.ERROR)  # Silence Werkzeug reques
 # logging.getLogger("cs_module.content_selection.user_manager").setLevel(logging.WARNING)
 
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson; falls back to Flask's handling for types orjson doesn't know."""
+
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=self._OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 
 
 # Global Variables
@@ -29,6 +53,20 @@ content_selection = ContentSelection(
 )
 recommendations_to_send = {}
 resources_to_send = {}
+# ContentSelection keeps all state in memory and is not thread-safe; serialise access under threaded servers.
+# The clock it reads (time_handler) is only moved under this lock too.
+_cs_lock = threading.Lock()
+# one worker: plan files are written in arrival order, off the request thread
+_file_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cs-file-writer")
+
+
+def _write_file(path, payload: bytes):
+    try:
+        with open(path, "wb") as file:
+            file.write(payload)
+        logger.debug("Saved %s", path)
+    except OSError as e:
+        logger.error("Failed to write %s: %s", path, e)
 
 
 def _as_bool(x, default=False):
@@ -62,7 +100,8 @@ def set_start_time():
             400,
         )
 
-    time_handler.set_start_time(dt)
+    with _cs_lock:
+        time_handler.set_start_time(dt)
     return jsonify({"start_time": dt.isoformat()}), 200
 
 
@@ -73,7 +112,8 @@ def set_time_mode():
     if not mode:
         return jsonify({"error": "Missing 'mode'. Use REAL | FROZEN"}), 400
     try:
-        time_handler.set_mode(mode)
+        with _cs_lock:
+            time_handler.set_mode(mode)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     return jsonify({"mode": mode}), 200
@@ -86,56 +126,87 @@ def set_current_time():
         dt = time_handler.parse_client_ts(iso_time_str)
     except ValueError:
         return jsonify({"error": "Invalid datetime format. Use ISO 8601 like 2025-09-02T08:00:00Z"}), 400
-    time_handler.set(dt)
+    with _cs_lock:
+        time_handler.set(dt)
     return jsonify({"current_time": dt.isoformat(), "mode": getattr(time_handler, "_mode", "?")}), 200
 
 
+@app.route("/set_clock", methods=["POST"])
+def set_clock():
+    """Set time mode and, when given, the current time in a single call."""
+    body = request.get_json(silent=True) or {}
+    mode = body.get("mode")
+    if not mode:
+        return jsonify({"error": "Missing 'mode'. Use REAL | FROZEN"}), 400
+
+    dt = None
+    iso_time_str = body.get("time")
+    if iso_time_str is not None:
+        try:
+            dt = time_handler.parse_client_ts(iso_time_str)
+        except ValueError:
+            return jsonify({"error": "Invalid datetime format. Use ISO 8601 like 2025-09-02T08:00:00Z"}), 400
+
+    # mode and time move together, never in between an /updates replay
+    with _cs_lock:
+        try:
+            time_handler.set_mode(mode)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if dt is not None:
+            time_handler.set(dt)
+        return jsonify({"current_time": time_handler.now.isoformat(), "mode": time_handler.mode}), 200
+
+
 @app.route("/recommendations", methods=["POST"])
 def recommendations_endpoint():
-    logging.info("Received request at /recommendations")
+    logger.debug("Received request at /recommendations")
     recommendations = request.get_json()
     if not recommendations:
-        logging.error("Invalid JSON data received at /recommendations")
+        logger.error("Invalid JSON data received at /recommendations")
         return jsonify({"error": "Invalid JSON data"}), 400
 
     global content_selection
-    content_selection.initialise_recommendations(recommendations)
-    logging.info("Recommendations successfully initialized")
+    with _cs_lock:
+        content_selection.initialise_recommendations(recommendations)
+    logger.info("Recommendations successfully initialized")
     return jsonify({"message": "Recommendations initialised"}), 201
 
 
 @app.route("/resources", methods=["POST"])
 def resources_endpoint():
-    logging.info("Received request at /resources")
+    logger.debug("Received request at /resources")
     resources = request.get_json()
     if not resources:
-        logging.error("Invalid JSON data received at /resources")
+        logger.error("Invalid JSON data received at /resources")
         return jsonify({"error": "Invalid JSON data"}), 400
 
     global content_selection
-    content_selection.initialise_resources(resources)
-    logging.info("Resources successfully initialized")
+    with _cs_lock:
+        content_selection.initialise_resources(resources)
+    logger.info("Resources successfully initialized")
     return jsonify({"message": "Resources initialised"}), 201
 
 
 @app.route("/missions", methods=["POST"])
 def missions_endpoint():
-    logging.info("Received request at /missions")
+    logger.debug("Received request at /missions")
     missions = request.get_json()
     if not missions:
-        logging.error("Invalid JSON data received at /missions")
+        logger.error("Invalid JSON data received at /missions")
         return jsonify({"error": "Invalid JSON data"}), 400
 
     global content_selection
-    content_selection.initialise_missions(missions)
-    logging.info("missions successfully initialized")
+    with _cs_lock:
+        content_selection.initialise_missions(missions)
+    logger.info("missions successfully initialized")
     return jsonify({"message": "missions initialised"}), 201
 
 
 @app.route("/updates", methods=["POST"])
 def updates_endpoint():
-    logging.info("TIMESTAMP: %s", time_handler.now)
-    logging.info("Received request at /updates")
+    if logger.isEnabledFor(logging.DEBUG):  # per-request; skip reading the clock when not logged
+        logger.debug("Received request at /updates (TIMESTAMP: %s)", time_handler.now)
 
     # 1️⃣  Parse JSON body (empty dict if missing/invalid)
     body = request.get_json(silent=True) or {}
@@ -149,19 +220,20 @@ def updates_endpoint():
     payload = body.get("data", body)
 
     if not payload:
-        logging.error("Invalid JSON data received at /updates")
+        logger.error("Invalid JSON data received at /updates")
         return jsonify({"error": "Invalid JSON data"}), 400
 
     # 4️⃣  Update your in-memory store
     global content_selection
-    content_selection.update(payload, is_learning=is_learning, is_intervention=is_intervention)
+    with _cs_lock:
+        content_selection.update(payload, is_learning=is_learning, is_intervention=is_intervention)
 
     return jsonify({"message": "Updates received"}), 201
 
 
 @app.route("/selected_contents", methods=["GET"])
 def selected_contents_endpoint():
-    logging.info("Received request at /selected_contents")
+    logger.debug("Received request at /selected_contents")
 
     start_time_str = request.args.get("start_time")
     end_time_str = request.args.get("end_time")
@@ -175,11 +247,12 @@ def selected_contents_endpoint():
         if end_time_str:
             end_time = time_handler.parse_client_ts(end_time_str)
     except ValueError as e:
-        logging.warning(f"Invalid datetime format: {e}")
+        logger.warning(f"Invalid datetime format: {e}")
         return jsonify({"error": "start_time and end_time must be in ISO 8601 format"}), 400
 
     # Get filtered selected contents
-    selected_contents = content_selection.get_selected_contents(start_time, end_time)
+    with _cs_lock:
+        selected_contents = content_selection.get_selected_contents(start_time, end_time)
 
     # logging.info(f"Selected contents: {selected_contents}")
     return jsonify(selected_contents), 200
@@ -187,22 +260,22 @@ def selected_contents_endpoint():
 
 @app.route("/recommendation_plans", methods=["POST"])
 def recommendation_plans_endpoint():
-    logging.info("Received request at /recommendation_plans")
+    logger.debug("Received request at /recommendation_plans")
     data = request.json
     if not data:
-        logging.error("Invalid JSON data received at /recommendation_plans")
+        logger.error("Invalid JSON data received at /recommendation_plans")
         return jsonify({"error": "Invalid JSON data"}), 400
 
-    # Save feedback to a file
-    with open("recommendation_plans.json", "w") as file:
-        json.dump(data, file, indent=4)
-    logging.info("Recommendation plans saved to recommendation_plans.json")
+    # Save feedback to a file: encode here (the plans are handed on below), write in the background
+    payload = orjson.dumps(data) if orjson is not None else json.dumps(data).encode()
+    _file_writer.submit(_write_file, "recommendation_plans.json", payload)
 
-    response = content_selection.save_recommendation_plans(data)
-    logging.info("Recommendation plans successfully processed")
+    with _cs_lock:
+        response = content_selection.save_recommendation_plans(data)
+    logger.debug("Recommendation plans successfully processed")
     return jsonify(response), 201
 
 
 if __name__ == "__main__":
-    logging.info("Starting CS API service...")
+    logger.info("Starting CS API service...")
     app.run(host="0.0.0.0", port=8000)
@@ -9,9 +9,11 @@ class BernoulliBetaTS:
         self.beta_0 = beta_0
         self.initial_parameters = self._initial_parameters()
 
-        # Store parameters dynamically as actions are encountered
-        self.alpha = {}
-        self.beta = {}
+        # Store parameters dynamically as actions are encountered: action -> row in the alpha/beta arrays
+        self._idx = {}
+        self._n = 0
+        self.alpha = np.empty(0, dtype=np.float64)
+        self.beta = np.empty(0, dtype=np.float64)
 
     def _initial_parameters(self):
         """Store initial parameters for the first action."""
@@ -20,41 +22,52 @@ class BernoulliBetaTS:
             "beta_0": self.beta_0,
         }
 
+    def _grow(self):
+        """Double the capacity of the parameter arrays."""
+        cap = max(8, 2 * len(self.alpha))
+        for name in ("alpha", "beta"):
+            old = getattr(self, name)
+            new = np.empty(cap, dtype=np.float64)
+            new[: self._n] = old[: self._n]
+            setattr(self, name, new)
+
     def _initialize_action(self, action):
-        """Initialize parameters for a new action if not already present."""
-        if action not in self.alpha:
-            self.alpha[action] = self.alpha_0
-            self.beta[action] = self.beta_0
+        """Initialize parameters for a new action if not already present; returns the action's row."""
+        i = self._idx.get(action)
+        if i is None:
+            if self._n == len(self.alpha):
+                self._grow()
+            i = self._idx[action] = self._n
+            self._n += 1
+            self.alpha[i] = self.alpha_0
+            self.beta[i] = self.beta_0
+        return i
 
     def select_action(self, actions):
         """Sample from posterior and select the action with the highest sampled value"""
+        # Ensure every action is registered and gather its row
+        idx = np.fromiter((self._initialize_action(a) for a in actions), dtype=np.intp, count=len(actions))
 
-        sampled = {}
-
-        for action in actions:
-            self._initialize_action(action)  # Ensure action is registered
-
-            # Sample theta from Beta(α, β)
-            sampled_theta = np.random.beta(self.alpha[action], self.beta[action])
+        # Sample theta from Beta(α, β) for every action in one call (same draws, in order, as one call per action)
+        samples = np.random.beta(self.alpha[idx], self.beta[idx])
 
-            sampled[action] = {
-                "sampled_theta": sampled_theta,
-            }
+        # the full per-action sample is persisted with the selection
+        sampled = {action: {"sampled_theta": theta} for action, theta in zip(actions, samples)}
 
         # Pick the best action by sampled reward
-        best_action = max(sampled, key=lambda a: sampled[a]["sampled_theta"])
+        best_action = actions[int(samples.argmax())]
         return best_action, sampled
 
     def update(self, action, reward):
-        self._initialize_action(action)  # Ensure the action is registered
+        i = self._initialize_action(action)  # Ensure the action is registered
         if reward == 1:
-            self.alpha[action] += 1  # Increment successes
+            self.alpha[i] += 1  # Increment successes
         else:
-            self.beta[action] += 1
+            self.beta[i] += 1
 
         params = {
             "action": action,
-            "alpha": self.alpha[action],
-            "beta": self.beta[action],
+            "alpha": float(self.alpha[i]),
+            "beta": float(self.beta[i]),
         }
         return params
@@ -1,4 +1,5 @@
 import numpy as np
+from scipy.special import expit
 
 
 # Logistic Thompson Sampling with Laplace approximation for Bayesian logistic regression.
@@ -22,6 +23,12 @@ class LogisticLaplaceTS:
         # Keep a copy of prior diagonal to floor precision
         self._P0_diag = np.ones(feature_dim)
 
+        # posterior std sqrt(Pd), cached between updates; None means stale
+        self._sigma = None
+
+        # scratch buffer so update() allocates no per-call temporaries
+        self._tmp = np.empty(feature_dim)
+
         self.initial_parameters = self._initial_parameters()
 
     def _initial_parameters(self):
@@ -31,28 +38,30 @@ class LogisticLaplaceTS:
         }
 
     def select_action(self, actions, feature_vectors):
-        feature_vectors = np.array(feature_vectors)
+        feature_vectors = np.asarray(feature_vectors, dtype=np.float64)  # no copy for ndarray input
 
         # Sample theta from the Gaussian prior
         # theta_sample = np.random.multivariate_normal(self.mu, np.linalg.inv(self.P))
 
         # sampling: Cov = diag(1/Pd)
-        theta_sample = self.mu + np.random.normal(size=self.feature_dim) / np.sqrt(self.Pd)
+        if self._sigma is None:
+            self._sigma = np.sqrt(self.Pd)
+        theta_sample = self.mu + np.random.standard_normal(self.feature_dim) / self._sigma
 
-        # Compute the probabilities using the logistic function
         logits = feature_vectors @ theta_sample
-        probabilities = 1 / (1 + np.exp(-logits))
 
-        # Select the action with the highest probability
-        best_idx = np.argmax(probabilities)
+        # Select the action with the highest probability; the logistic function is monotonic,
+        # so only the winning logit needs converting
+        best_idx = int(logits.argmax())
         sampled = {
             "theta": theta_sample,
-            "estimated_reward": probabilities[best_idx],
+            "estimated_reward": expit(logits[best_idx]),
         }
         return actions[best_idx], feature_vectors[best_idx].tolist(), sampled
 
     def update(self, feature_vector, reward):
-        x = np.asarray(feature_vector)
+        x = np.asarray(feature_vector, dtype=np.float64)
+        tmp = self._tmp
 
         # --------- Forgetting step (applied BEFORE the new observation) ----------
         if 0 < self.discount < 1:
@@ -61,25 +70,31 @@ class LogisticLaplaceTS:
             # Decay precision (lose confidence in old info) and floor at prior
             # self.P[idx] *= self.discount
             # self.P[idx] = np.maximum(self.P[idx], self._P0_diag)
-            self.Pd = self.Pd * self.discount
-            self.Pd = np.maximum(self.Pd, self._P0_diag)
+            self.Pd *= self.discount
+            np.maximum(self.Pd, self._P0_diag, out=self.Pd)
 
         # Standard Laplace/online-Newton update (diagonal approx)
-        sigmoid = 1 / (1 + np.exp(-x @ self.mu))
+        sigmoid = expit(x @ self.mu)
 
         # 2) aggiorno la precisione diagonale
         # diag_old = np.diag(self.P).copy()  # s_i^(old)
         # diag_new = diag_old + x**2 * sigmoid * (1 - sigmoid)
         # self.P[np.diag_indices(self.feature_dim)] = diag_new
 
-        self.Pd += (x**2) * sigmoid * (1 - sigmoid)
+        # in place: Pd += x**2 * sigmoid * (1 - sigmoid), same evaluation order
+        np.multiply(x, x, out=tmp)
+        tmp *= sigmoid
+        tmp *= 1 - sigmoid
+        self.Pd += tmp
+        self._sigma = None
 
         # 3) gradiente (solo likelihood, perché gradiente di prior si annulla)
-        grad = (sigmoid - reward) * x
+        grad = np.multiply(sigmoid - reward, x, out=tmp)
 
         # 4) un passo di Newton coord-by-coord con la precisione aggiornata
         # self.mu = self.mu - grad / diag_new
-        self.mu = self.mu - grad / self.Pd
+        grad /= self.Pd
+        self.mu -= grad
 
         params = {
             "mu": self.mu.copy(),
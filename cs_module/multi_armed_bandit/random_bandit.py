@@ -1,4 +1,3 @@
-import random
 import numpy as np
 
 
@@ -7,12 +6,12 @@ class RandomBandit:
         self.initial_parameters = {}
 
     def select_action(self, actions):
-        expected_rewards = [random.uniform(0, 1) for _ in actions]
-        best_idx = np.argmax(expected_rewards)
+        expected_rewards = np.random.random(len(actions))
+        best_idx = int(expected_rewards.argmax())
         best_action = actions[best_idx]
         sampled = {
             "action": best_action,
-            "estimated_reward": expected_rewards[best_idx],
+            "estimated_reward": float(expected_rewards[best_idx]),
         }
         return best_action, sampled
 
@@ -6,6 +6,9 @@ class RecommendationOptimalBandit:
     def __init__(self, intervention_pref, recommendation_pref):
         self.intervention_pref = intervention_pref
         self.recommendation_pref = recommendation_pref
+        # dense copy of recommendation_pref for gathering by row; the preferences are fixed
+        self._rec_id_to_idx = {rec_id: i for i, rec_id in enumerate(recommendation_pref)}
+        self._rec_pref_arr = np.fromiter(recommendation_pref.values(), dtype=np.float64, count=len(recommendation_pref))
         self.initial_parameters = self._initial_parameters()
 
     def _initial_parameters(self):
@@ -20,22 +23,20 @@ class RecommendationOptimalBandit:
         int_ratings = self.intervention_pref @ feature_vectors.T
 
         # Assume additive effects of recommendations
-        int_rec_ratings = {
-            rec_id: int_ratings[i] + self.recommendation_pref[rec_id]
-            for i, rec_ids in enumerate(actions)
-            for rec_id in rec_ids
-        }
+        group_sizes = np.fromiter((len(group) for group in actions), dtype=np.intp, count=len(actions))
+        rec_idx = np.fromiter((self._rec_id_to_idx[rec_id] for rec_id in rec_ids), dtype=np.intp, count=len(rec_ids))
+        int_rec_ratings = np.repeat(int_ratings, group_sizes) + self._rec_pref_arr[rec_idx]
 
-        expected_rewards = []
+        # Select action with the highest sampled reward; the sigmoid is monotonic, so only the winner needs it
+        best_idx = int(int_rec_ratings.argmax())
+        best_rec = rec_ids[best_idx]
         if REWARD_TYPE == "thumbs":
-            expected_rewards = [1 / (1 + np.exp(-rating)) for rating in int_rec_ratings.values()]
+            estimated_reward = 1 / (1 + np.exp(-int_rec_ratings[best_idx]))
         elif REWARD_TYPE == "float":
-            expected_rewards = list(int_rec_ratings.values())
-
-        # Select action with the highest sampled reward
-        best_idx = np.argmax(expected_rewards)
-        best_rec = rec_ids[best_idx]
-        sampled = {"estimated_reward": expected_rewards[best_idx], "action": best_rec}
+            estimated_reward = int_rec_ratings[best_idx]
+        else:
+            raise ValueError(f"Unknown REWARD_TYPE: {REWARD_TYPE}")
+        sampled = {"estimated_reward": estimated_reward, "action": best_rec}
         return best_rec, sampled
 
     def update(self, action):
@@ -12,8 +12,9 @@ class ResourceOptimalBandit:
         }
 
     def select_action(self, actions):
-        expected_rewards = [1 / (1 + np.exp(-self.resource_pref[action])) for action in actions]
-        best_idx = np.argmax(expected_rewards)
+        prefs = np.fromiter((self.resource_pref[action] for action in actions), dtype=np.float64, count=len(actions))
+        expected_rewards = 1 / (1 + np.exp(-prefs))
+        best_idx = int(expected_rewards.argmax())
         best_action = actions[best_idx]
         sampled = {"estimated_reward": expected_rewards[best_idx], "action": best_action}
         return best_action, sampled
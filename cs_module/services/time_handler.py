@@ -20,6 +20,7 @@ class TimeHandler:
       - /set_time_mode {"mode": "REAL"|"FROZEN"}
       - /set_current_time "2025-09-02T08:00:00Z"  (effective only in FROZEN)
       - /set_start_time  "..."                    (effective only in FROZEN)
+      - /set_clock {"mode": ..., "time": "..."|null}  (both of the above in one call)
     """
 
     REAL = "REAL"
@@ -0,0 +1,104 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from cs_module.content_selection.mab_updater import MABUpdater
+from cs_module.content_selection.user import User
+from cs_module.services.time_handler import TimeHandler
+
+SEL_TS = datetime(2025, 1, 6, 8, tzinfo=timezone.utc)
+MISSION_ID = "M1"
+RECOMMENDATIONS = {
+    "SRc1": {"intervention_type": ["Education"]},
+    "ARc2": {"intervention_type": ["Training", "Modelling"]},
+    "NRc3": {"intervention_type": []},
+    "PRc4": {"intervention_type": ["Modelling"]},
+    "SRc52": {"intervention_type": ["Education"]},
+    "SRc100": {"intervention_type": ["Training"]},
+    "SRc101": {"intervention_type": ["Training", "Modelling"]},
+}
+MISSIONS = {MISSION_ID: {"weekly_frequency": 3}}
+# sent order within the plan week: SRc52 is pruned after its first send, SRc101 after SRc100
+SENT = ["SRc1", "SRc52", "ARc2", "SRc100", "SRc1", "SRc101", "SRc52", "PRc4", "NRc3", "ARc2"]
+
+
+def _make_updater():
+    return MABUpdater(
+        binder=None,
+        time_handler=None,
+        resource_mab=None,
+        intervention_mab=None,
+        recommendation_mab=None,
+        user_manager=None,
+        recommendations=RECOMMENDATIONS,
+        missions=MISSIONS,
+        resources={},
+        data_storage=None,
+    )
+
+
+def _make_user():
+    time_handler = TimeHandler(current_time=SEL_TS + timedelta(days=6), mode=TimeHandler.FROZEN)
+    user = User(
+        user_id="u1",
+        time_handler=time_handler,
+        personal_data={"gender": "female", "userAge": 55, "education": "primary", "recruitmentCenter": "ICO"},
+    )
+    user.update_missions_and_contents(
+        {
+            "new_missions": [
+                {
+                    "mission": MISSION_ID,
+                    "recommendations": list(RECOMMENDATIONS),
+                    "resources": [],
+                    "selection_timestamp": SEL_TS.isoformat(),
+                    "prescribed": False,
+                }
+            ]
+        }
+    )
+    for i, rec_id in enumerate(SENT, start=1):
+        user.track_sent_recommendations(
+            SEL_TS + timedelta(hours=6 * i), 1000 + i, rec_id, RECOMMENDATIONS[rec_id]["intervention_type"], MISSION_ID
+        )
+    return user
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_cached_slot_replay_matches_uncached_replay(seed):
+    """FVs from the prefix-replay cache equal a from-scratch replay per send, whatever the processing order."""
+    cached_updater = _make_updater()
+    cached_user, reference_user = _make_user(), _make_user()
+    order = list(range(1, len(SENT) + 1))
+    random.Random(seed).shuffle(order)
+
+    for slot_index in order:
+        rec_id = SENT[slot_index - 1]
+        seq = cached_updater._sent_seq_for_mission(cached_user, MISSION_ID, SEL_TS)
+        cached = cached_updater._fvs_for_slot_at_selection_time(
+            cached_user, MISSION_ID, SEL_TS, rec_id, seq, slot_index
+        )
+        # a fresh updater has an empty cache: this is the uncached replay
+        reference = _make_updater()._fvs_for_slot_at_selection_time(
+            reference_user, MISSION_ID, SEL_TS, rec_id, seq, slot_index
+        )
+        assert cached == reference, (slot_index, rec_id)
+
+    assert cached_user.only_one_rec_already == reference_user.only_one_rec_already
+
+
+def test_slot_replay_prunes_constrained_recs():
+    updater = _make_updater()
+    user = _make_user()
+    seq = updater._sent_seq_for_mission(user, MISSION_ID, SEL_TS)
+
+    # the first SRc52 send (slot 2) gets its FV; counting it for the prompted FV prunes it for good
+    fv, fv_prompted = updater._fvs_for_slot_at_selection_time(user, MISSION_ID, SEL_TS, "SRc52", seq, 2)
+    assert fv is not None and fv_prompted is None
+    assert user.only_one_rec_already == ["SRc52"]
+    # SRc100 (slot 4) was available when sent, and sending it does not prune itself
+    fv, fv_prompted = updater._fvs_for_slot_at_selection_time(user, MISSION_ID, SEL_TS, "SRc100", seq, 4)
+    assert fv is not None and fv_prompted is not None
+    # SRc101 (slot 6) follows SRc100: pruned, so it gets no FV
+    assert updater._fvs_for_slot_at_selection_time(user, MISSION_ID, SEL_TS, "SRc101", seq, 6) == (None, None)
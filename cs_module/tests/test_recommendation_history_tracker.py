@@ -0,0 +1,78 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from cs_module.config import INTERVENTION_TYPES
+from cs_module.utils.encoding import get_intervention_encoding
+from cs_module.utils.recommendation_history_tracker import RecommendationHistoryTracker
+
+T0 = datetime(2025, 1, 6, tzinfo=timezone.utc)
+REC_IDS = ["SRc1", "ARc2", "NRc3", "PRc4"]
+
+
+def _sends(seed, n=80):
+    rng = random.Random(seed)
+    return [
+        (
+            T0 + timedelta(hours=rng.randrange(0, 24 * 21, 6)),  # coarse grid: plenty of equal timestamps
+            1000 + i,
+            rng.choice(REC_IDS),
+            rng.sample(INTERVENTION_TYPES, rng.randint(0, 3)),
+            rng.choice(["M1", "M2"]),
+        )
+        for i in range(n)
+    ]
+
+
+def _windows(sends):
+    # None, windows starting/ending exactly on send timestamps, and empty/out-of-range ones
+    stamps = sorted({ts for ts, *_ in sends})
+    windows = [None, (T0 - timedelta(days=30), T0 - timedelta(days=1)), (stamps[5], stamps[5])]
+    windows += [(stamps[i], stamps[j]) for i, j in ((0, 10), (3, 4), (7, -1), (12, 30))]
+    windows += [(stamps[-1], stamps[-1] + timedelta(days=7)), (stamps[8] - timedelta(days=7), stamps[8])]
+    return windows
+
+
+def _in(time_window, ts):
+    return time_window is None or time_window[0] <= ts < time_window[1]
+
+
+def test_window_queries_match_linear_scan():
+    for seed in range(5):
+        sends = _sends(seed)
+        tracker = RecommendationHistoryTracker()
+        for send in sends:
+            tracker.add_recommendation(*send)
+        mixes = [(ts, rid, tuple(get_intervention_encoding(it)), mid) for ts, _, rid, it, mid in sends]
+
+        for time_window in _windows(sends):
+            for rec_id in [None] + REC_IDS:
+                for single_intv in (None, 0.0, 1.0):
+                    expected = sum(
+                        1
+                        for ts, rid, mix, _ in mixes
+                        if _in(time_window, ts)
+                        and (rec_id is None or rid == rec_id)
+                        and (single_intv is None or single_intv in mix)
+                    )
+                    assert tracker.get_count(time_window, rec_id, single_intv) == expected
+
+            expected_counters = np.zeros(len(INTERVENTION_TYPES))
+            for ts, _, mix, _ in sorted(mixes, key=lambda m: m[0]):
+                if _in(time_window, ts):
+                    expected_counters += mix
+            np.testing.assert_allclose(tracker.get_type_counters(time_window), expected_counters, rtol=0, atol=1e-12)
+
+
+def test_type_counters_cache_is_invalidated_on_add():
+    tracker = RecommendationHistoryTracker()
+    tracker.add_recommendation(T0, 1, "SRc1", ["Education"], "M1")
+    window = (T0, T0 + timedelta(days=1))
+    before = tracker.get_type_counters(window).copy()
+
+    tracker.add_recommendation(T0 + timedelta(hours=1), 2, "SRc1", ["Education"], "M1")
+
+    np.testing.assert_array_equal(tracker.get_type_counters(window), 2 * before)
+    assert not tracker.get_type_counters(window).flags.writeable
+
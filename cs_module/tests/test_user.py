@@ -0,0 +1,70 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from cs_module.content_selection.user import User
+from cs_module.services.time_handler import TimeHandler
+
+T0 = datetime(2025, 1, 6, tzinfo=timezone.utc)
+
+
+def _make_user():
+    return User(user_id="u1", time_handler=TimeHandler(current_time=T0, mode=TimeHandler.FROZEN))
+
+
+def test_sliding_frequency_matches_linear_scan():
+    rng = random.Random(0)
+    user = _make_user()
+    sent = [T0 + timedelta(hours=rng.randrange(0, 24 * 30, 3)) for _ in range(60)]
+    user.update_recommendation_open_history(
+        [{"type": "recommendation", "content_id": "SRc1", "sent_timestamp": ts.isoformat()} for ts in sent]
+        + [{"type": "resource", "content_id": "SRc1", "sent_timestamp": T0.isoformat()}]
+    )
+
+    # query times on, just before and just after the (sliding_window + 1)-day boundaries of each send
+    queries = [T0 - timedelta(days=1), T0 + timedelta(days=40)]
+    for ts in sent[:20]:
+        for days in (0, 7, 8, 3):
+            for nudge in (timedelta(0), timedelta(microseconds=1), -timedelta(microseconds=1)):
+                queries.append(ts + timedelta(days=days) + nudge)
+
+    for sliding_window in (0, 1, 7):
+        for query in queries:
+            expected = sum(1 for t in sent if (query - t).days <= sliding_window)
+            assert user.get_recommendation_sliding_frequency("SRc1", query, sliding_window) == expected
+    assert user.get_recommendation_sliding_frequency("ARc2", T0) == 0
+
+
+def _baseline_engagement_rate(sent, ratings, time_window):
+    n_sent = sum(1 for ts in sent if time_window is None or time_window[0] <= ts < time_window[1])
+    if n_sent == 0:
+        return 0.0
+    vol = sum(
+        1
+        for ts, _, is_prompted in ratings
+        if (time_window is None or time_window[0] <= ts < time_window[1]) and not is_prompted
+    )
+    return max(0.0, min(1.0, vol / n_sent))
+
+
+def test_engagement_rate_matches_linear_scan():
+    rng = random.Random(1)
+    sent = [T0 + timedelta(hours=rng.randrange(0, 24 * 21, 6)) for _ in range(40)]
+    ratings = [(T0 + timedelta(hours=rng.randrange(0, 24 * 21, 6)), "SRc1", rng.random() < 0.3) for _ in range(30)]
+
+    tracked = _make_user()
+    for ts, rec_id, is_prompted in ratings:  # out of time order, like feedback replays
+        tracked.track_rating(ts, rec_id, is_prompted)
+    # a User restored with its rating history seeds the sorted index in __post_init__
+    restored = User(
+        user_id="u2", time_handler=TimeHandler(current_time=T0, mode=TimeHandler.FROZEN), rating_history=list(ratings)
+    )
+    for user in (tracked, restored):
+        for i, ts in enumerate(sent):
+            user.track_sent_recommendations(ts, i, "SRc1", ["Education"], "M1")
+
+    stamps = sorted(set(sent) | {ts for ts, _, _ in ratings})
+    windows = [None, (T0 - timedelta(days=7), T0)] + [(ts - timedelta(weeks=1), ts) for ts in stamps[::3]]
+    windows += [(stamps[i], stamps[j]) for i, j in ((0, 5), (4, 4), (10, -1))]
+    for user in (tracked, restored):
+        for time_window in windows:
+            assert user.get_engagement_rate(time_window) == _baseline_engagement_rate(sent, ratings, time_window)
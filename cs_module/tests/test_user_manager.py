@@ -0,0 +1,100 @@
+import random
+
+from cs_module.content_selection.user_manager import UserManager
+from cs_module.services.time_handler import TimeHandler
+
+
+def _omi_plans(user_ids):
+    """Recommendation plans shaped like omi_module's /recommendation_plans response."""
+    return {
+        "recommendation_plans": [
+            {
+                "user_id": user_id,
+                "plans": [
+                    {
+                        "content_id": "SRc1",
+                        "type": "recommendation",
+                        "mission_id": "M1",
+                        "scheduled_for": "2025-09-02T08:00:00Z",
+                    },
+                    {
+                        "content_id": "R1",
+                        "type": "resource",
+                        "mission_id": "M1",
+                        "scheduled_for": "2025-09-02T09:00:00Z",
+                    },
+                    {
+                        "content_id": "SRc1",
+                        "type": "recommendation",
+                        "mission_id": "M1",
+                        "scheduled_for": "2025-09-03T08:00:00Z",
+                    },
+                    {
+                        "content_id": "SRc2",
+                        "type": "recommendation",
+                        "mission_id": "M1",
+                        "scheduled_for": "2025-09-03T09:00:00Z",
+                    },
+                    {"type": "recommendation", "mission_id": "M1"},  # incomplete entry: skipped
+                ],
+                "plan_id": f"plan-{user_id}",
+            }
+            for user_id in user_ids
+        ]
+    }
+
+
+def test_save_recommendation_plans_accepts_omi_plans():
+    manager = UserManager(TimeHandler())
+    manager.add_users({user_id: {"enrolmentDate": "2025-09-01T00:00:00Z"} for user_id in ("u1", "u2")})
+    for user in manager.get_all_users().values():
+        user.new_plan_required = True
+
+    plans = _omi_plans(["u1", "u2"])
+    manager.save_recommendation_plans(plans)
+
+    for user_plan in plans["recommendation_plans"]:
+        user = manager.get_user(user_plan["user_id"])
+        assert user.current_recommendation_plan is user_plan
+        assert user.new_plan_required is False
+
+        assert user.rec_plan_to_frequency == {"SRc1": 2, "SRc2": 1}
+        assert user.get_sample_feedback_position(("2025-09-02T08:00:00Z", "SRc1")) == 1
+        assert user.get_sample_feedback_position(("2025-09-03T08:00:00Z", "SRc1")) == 2
+        assert user.get_sample_feedback_position(("2025-09-03T09:00:00Z", "SRc2")) == 1
+        assert user.get_sample_feedback_frequency("SRc1") == 2
+        assert len(user.rec_plan_to_position) == 3
+
+
+def _mission(mission_id):
+    return {
+        "mission": mission_id,
+        "recommendations": ["SRc1"],
+        "resources": [],
+        "selection_timestamp": "2025-09-02T08:00:00Z",
+        "prescribed": False,
+    }
+
+
+def test_users_needing_plan_match_full_scan():
+    rng = random.Random(0)
+    manager = UserManager(TimeHandler())
+    user_ids = [f"u{i}" for i in range(8)]
+    manager.add_users({user_id: {"enrolmentDate": "2025-09-01T00:00:00Z"} for user_id in user_ids})
+
+    for step in range(200):
+        user_id = rng.choice(user_ids)
+        action = rng.randrange(5)
+        if action == 0:
+            manager.update_missions_and_contents({user_id: {"new_missions": [_mission(f"M{step}")]}})
+        elif action == 1:
+            manager.apply_mission_selected(user_id, _mission(f"M{step}"))
+        elif action == 2:
+            manager.save_recommendation_plans({"recommendation_plans": [{"user_id": user_id, "plans": []}]})
+        elif action == 3:
+            manager.get_user(user_id).new_plan_required = False  # as _select_contents does after planning
+        else:
+            manager.add_users({user_id: {"enrolmentDate": "2025-09-01T00:00:00Z"}})  # re-registration resets
+
+        expected = [(uid, user) for uid, user in manager.get_all_users().items() if user.new_plan_required]
+        assert manager.get_users_needing_plan() == expected
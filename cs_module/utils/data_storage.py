@@ -373,36 +373,58 @@ class DataStorage:
         conn.close()
 
     def add_intervention_mab_update(self, update: dict):
+        self.add_intervention_mab_updates([update])
+
+    def add_mab_update(self, table: str, update: dict):
+        self.add_mab_updates(table, [update])
+
+    def add_intervention_mab_updates(self, updates: list):
+        """Insert several intervention MAB updates over one connection/commit."""
+        if not updates:
+            return
         conn = self._get_conn()
         cur = conn.cursor()
-        user_id = update.get("user_id")  # string
-        process_id = update.get("process_id")
-        ts = update.get("timestamp")
-        feature_vector = update.get("feature_vector")
-        reward = update.get("reward")
-        params = update.get("params")
-        clean = sanitize_for_json(params)
-        cur.execute(
+        rows = [
+            (
+                self.run_id,
+                update.get("user_id"),  # string
+                update.get("process_id"),
+                update.get("timestamp"),
+                update.get("feature_vector"),
+                update.get("reward"),
+                json.dumps(sanitize_for_json(update.get("params"))),
+            )
+            for update in updates
+        ]
+        cur.executemany(
             "INSERT INTO intervention_mab_updates(run_id, user_id, process_id, timestamp, feature_vector, reward, params) VALUES (%s, %s, %s, %s, %s, %s, %s);",
-            (self.run_id, user_id, process_id, ts, feature_vector, reward, json.dumps(clean)),
+            rows,
         )
         conn.commit()
         cur.close()
         conn.close()
 
-    def add_mab_update(self, table: str, update: dict):
+    def add_mab_updates(self, table: str, updates: list):
+        """Insert several resource/recommendation MAB updates over one connection/commit."""
+        if not updates:
+            return
         conn = self._get_conn()
         cur = conn.cursor()
-        user_id = update.get("user_id")  # string
-        process_id = update.get("process_id")
-        ts = update.get("timestamp")
-        reward = update.get("reward")
-        params = update.get("params")
-        clean = sanitize_for_json(params)
-        cur.execute(
+        rows = [
+            (
+                self.run_id,
+                update.get("user_id"),  # string
+                update.get("process_id"),
+                update.get("timestamp"),
+                update.get("reward"),
+                json.dumps(sanitize_for_json(update.get("params"))),
+            )
+            for update in updates
+        ]
+        cur.executemany(
             f"INSERT INTO {table}(run_id, user_id, process_id, timestamp, reward, params) "
             f"VALUES (%s, %s, %s, %s, %s, %s);",
-            (self.run_id, user_id, process_id, ts, reward, json.dumps(clean)),
+            rows,
         )
         conn.commit()
         cur.close()
@@ -428,17 +450,29 @@ class DataStorage:
         conn.close()
 
     def add_mab_sample(self, table: str, record: dict):
+        self.add_mab_samples(table, [record])
+
+    def add_mab_samples(self, table: str, records: list):
+        """Insert several resource/recommendation MAB samples over one connection/commit."""
+        if not records:
+            return
         conn = self._get_conn()
         cur = conn.cursor()
-        user_id = record.get("user_id")  # string
-        pc = record.get("plan_id")  # string
-        cc = record.get("content_count")
-        ts = record.get("timestamp")
-        sample = sanitize_for_json(record.get("sample"))
-        cur.execute(
+        rows = [
+            (
+                self.run_id,
+                record.get("user_id"),  # string
+                record.get("plan_id"),  # string
+                record.get("content_count"),
+                record.get("timestamp"),
+                json.dumps(sanitize_for_json(record.get("sample"))),
+            )
+            for record in records
+        ]
+        cur.executemany(
             f"INSERT INTO {table}(run_id, user_id, plan_id, content_count, timestamp, sample) "
             f"VALUES (%s, %s, %s, %s, %s, %s);",
-            (self.run_id, user_id, pc, cc, ts, json.dumps(sample)),
+            rows,
         )
         conn.commit()
         cur.close()
@@ -1,5 +1,6 @@
 # --- Unified feature schema -----------------------------------------------
 
+from functools import lru_cache
 from itertools import product
 from cs_module.config import (
     PILLARS,
@@ -75,39 +76,44 @@ def get_personal_data_labels():
     return labels
 
 
+# Precomputed once: categorical values kept after LEAVE_OUT_VARS, and value → position lookups
+_CATEGORICAL_VALUES = {
+    feature: [v for v in values if v not in LEAVE_OUT_VARS.get(feature, [])]
+    for feature, values in PERSONAL_DATA_CATEGORICAL_FEATURES.items()
+}
+_CATEGORICAL_INDEX = {
+    feature: {v: i for i, v in enumerate(values)} for feature, values in _CATEGORICAL_VALUES.items()
+}
+
+
 def get_personal_data_encoding(personal_data):
     enc = []
     for feature in PERSONAL_DATA_FEATURES:
-        if feature in PERSONAL_DATA_CATEGORICAL_FEATURES:
-            values = [
-                v for v in PERSONAL_DATA_CATEGORICAL_FEATURES[feature] if v not in LEAVE_OUT_VARS.get(feature, [])
-            ]
+        if feature in _CATEGORICAL_INDEX:
+            index = _CATEGORICAL_INDEX[feature]
+            raw = personal_data.get(feature)
             if feature in CATEGORICAL_TO_NUMERIC:
-                if feature not in personal_data or personal_data[feature] is None:
+                if raw is None:
                     val = 0.5
                 elif feature in CATEGORICAL_TO_NUMERIC_EXPLICIT:
-                    val = CATEGORICAL_TO_NUMERIC_EXPLICIT[feature].get(personal_data.get(feature), 0.5)
+                    val = CATEGORICAL_TO_NUMERIC_EXPLICIT[feature].get(raw, 0.5)
                 else:
-                    val = (
-                        0.5
-                        if personal_data[feature] not in values
-                        else values.index(personal_data[feature]) / (len(values) - 1)
-                    )
+                    pos = index.get(raw)
+                    val = 0.5 if pos is None else pos / (len(index) - 1)
+                enc.append(val)
             else:
-                val = personal_data.get(feature)
-                val = [0] * len(values) if val not in values else one_hot_encode(val, values)
+                one_hot = [0] * len(index)
+                pos = index.get(raw)
+                if pos is not None:
+                    one_hot[pos] = 1
+                enc.extend(one_hot)
         else:
-            if feature not in personal_data or personal_data[feature] is None:
+            val = personal_data.get(feature)
+            if val is None:
                 val = 0.5
-            else:
-                val = personal_data[feature]
-                if feature in NUMERIC_FEATURES_MIN_MAX:
-                    a, b = NUMERIC_FEATURES_MIN_MAX[feature]
-                    val = min_max_norm(val, a, b)
-
-        if isinstance(val, list):
-            enc.extend(val)
-        else:
+            elif feature in NUMERIC_FEATURES_MIN_MAX:
+                a, b = NUMERIC_FEATURES_MIN_MAX[feature]
+                val = min_max_norm(val, a, b)
             enc.append(val)
     return enc
 
@@ -133,6 +139,29 @@ BASE_LABELS = {
 
 BASE_DIMENSIONS = {k: len(v) for k, v in BASE_LABELS.items()}
 
+# Optional cartesian families (kept behind flags)
+_INTERACTION_PAIRS = {
+    "D_H": ("D", "H"),
+    "D_P": ("D", "P"),
+    "D_IT": ("D", "IT"),
+    "D_MF": ("D", "MF"),
+    "D_TF": ("D", "TF"),
+    "D_IF": ("D", "IF"),
+    "D_RF": ("D", "RF"),
+    "P_IT": ("P", "IT"),
+    "P_MF": ("P", "MF"),
+    "P_TF": ("P", "TF"),
+    "P_IF": ("P", "IF"),
+    "I_IF": ("IT", "IF"),
+    "I_RF": ("IT", "RF"),
+}
+
+# Enabled flags resolved once at import, so featurization iterates only what is on
+_ACTIVE_BASE_BLOCKS = tuple(k for k in BASE_LABELS if INTERVENTION_MAB_FEATURES.get(k, False))
+_ACTIVE_INTERACTION_PAIRS = tuple(
+    pair for inter_key, pair in _INTERACTION_PAIRS.items() if INTERVENTION_MAB_FEATURES.get(inter_key, False)
+)
+
 
 # ========== Atomic encoders for each block ==========
 
@@ -152,10 +181,14 @@ def get_num_intervention_days_encoding(days):
     return [max(0.0, min(1.0, v))]
 
 
+_PILLAR_SET = frozenset(PILLARS)
+_ENCODED_PILLARS = [p for p in PILLARS if p not in LEAVE_OUT_VARS.get("pillar", [])]
+
+
 def get_pillar_encoding(pillar):
-    if pillar not in PILLARS:
+    if pillar not in _PILLAR_SET:
         raise ValueError(f"Invalid pillar: {pillar}")
-    return one_hot_encode(pillar, [p for p in PILLARS if p not in LEAVE_OUT_VARS.get("pillar", [])])
+    return one_hot_encode(pillar, _ENCODED_PILLARS)
 
 
 def get_mission_frequency_encoding(mf):
@@ -167,13 +200,23 @@ def get_total_frequency_encoding(x, *, scheduled):
     return encode_frequency(x, FREQUENCY_FEATURE_DEGREES["TF"], 0, cap)
 
 
+_INTERVENTION_TYPE_INDEX = {t: j for j, t in enumerate(INTERVENTION_TYPES)}
+
+
 def get_intervention_encoding(intervention):
-    intervention = intervention or []
-    if not all(i in INTERVENTION_TYPES for i in intervention):
-        raise ValueError(f"Invalid intervention types: {intervention}")
-    mh = [1 if i in intervention else 0 for i in INTERVENTION_TYPES]
+    """Normalized mixture over INTERVENTION_TYPES, as a shared (immutable) tuple."""
+    return _intervention_encoding(tuple(intervention or ()))
+
+
+@lru_cache(maxsize=None)
+def _intervention_encoding(intervention):
+    if not all(i in _INTERVENTION_TYPE_INDEX for i in intervention):
+        raise ValueError(f"Invalid intervention types: {list(intervention)}")
+    mh = [0] * len(INTERVENTION_TYPES)
+    for i in intervention:
+        mh[_INTERVENTION_TYPE_INDEX[i]] = 1
     s = sum(mh)
-    return [0.0] * len(INTERVENTION_TYPES) if s == 0 else [x / s for x in mh]
+    return (0.0,) * len(INTERVENTION_TYPES) if s == 0 else tuple(x / s for x in mh)
 
 
 def get_num_int_types_encoding(intervention):
@@ -219,9 +262,8 @@ def _get_hhs_current_centered(H, pillar):
 def get_intervention_feature_vector_labels():
     labs = ["bias"]
     # base blocks in order
-    for key in BASE_LABELS:
-        if INTERVENTION_MAB_FEATURES.get(key, False):
-            labs.extend(BASE_LABELS[key])
+    for key in _ACTIVE_BASE_BLOCKS:
+        labs.extend(BASE_LABELS[key])
 
     # custom interactions (scheduled-only, compact)
     if INTERVENTION_MAB_FEATURES.get("MF_x_TF_sched", False):
@@ -244,33 +286,16 @@ def get_intervention_feature_vector_labels():
         labs.extend([f"HHS_c_x_IT_{t}" for t in INTERVENTION_TYPES])
 
     # (optional) classic cartesian families
-    INTERACTION_PAIRS = {
-        "D_H": ("D", "H"),
-        "D_P": ("D", "P"),
-        "D_IT": ("D", "IT"),
-        "D_MF": ("D", "MF"),
-        "D_TF": ("D", "TF"),
-        "D_IF": ("D", "IF"),
-        "D_RF": ("D", "RF"),
-        "P_IT": ("P", "IT"),
-        "P_MF": ("P", "MF"),
-        "P_TF": ("P", "TF"),
-        "P_IF": ("P", "IF"),
-        "I_IF": ("IT", "IF"),
-        "I_RF": ("IT", "RF"),
-    }
-    for inter_key, (a, b) in INTERACTION_PAIRS.items():
-        if INTERVENTION_MAB_FEATURES.get(inter_key, False):
-            labs.extend([f"{la}_{lb}" for la in BASE_LABELS[a] for lb in BASE_LABELS[b]])
+    for a, b in _ACTIVE_INTERACTION_PAIRS:
+        labs.extend([f"{la}_{lb}" for la in BASE_LABELS[a] for lb in BASE_LABELS[b]])
 
     return labs
 
 
 def get_dim_intervention_feature_vector(include_bias=True):
     dim = 1 if include_bias else 0
-    for key in BASE_LABELS:
-        if INTERVENTION_MAB_FEATURES.get(key, False):
-            dim += BASE_DIMENSIONS[key]
+    for key in _ACTIVE_BASE_BLOCKS:
+        dim += BASE_DIMENSIONS[key]
 
     # custom interactions
     if INTERVENTION_MAB_FEATURES.get("MF_x_TF_sched", False):
@@ -291,24 +316,8 @@ def get_dim_intervention_feature_vector(include_bias=True):
         dim += len(INTERVENTION_TYPES)
 
     # optional cartesian families
-    INTERACTION_PAIRS = {
-        "D_H": ("D", "H"),
-        "D_P": ("D", "P"),
-        "D_IT": ("D", "IT"),
-        "D_MF": ("D", "MF"),
-        "D_TF": ("D", "TF"),
-        "D_IF": ("D", "IF"),
-        "D_RF": ("D", "RF"),
-        "P_IT": ("P", "IT"),
-        "P_MF": ("P", "MF"),
-        "P_TF": ("P", "TF"),
-        "P_IF": ("P", "IF"),
-        "I_IF": ("IT", "IF"),
-        "I_RF": ("IT", "RF"),
-    }
-    for inter_key, (a, b) in INTERACTION_PAIRS.items():
-        if INTERVENTION_MAB_FEATURES.get(inter_key, False):
-            dim += BASE_DIMENSIONS[a] * BASE_DIMENSIONS[b]
+    for a, b in _ACTIVE_INTERACTION_PAIRS:
+        dim += BASE_DIMENSIONS[a] * BASE_DIMENSIONS[b]
 
     return dim
 
@@ -316,32 +325,43 @@ def get_dim_intervention_feature_vector(include_bias=True):
 # ========== Public: feature vector builder ==========
 
 
-def get_encodings(
+def _get_context_encodings(
     personal_data,
     hhs,
     num_intervention_days,
-    pillar,
     mission_frequency,
     total_frequency_past_week,
     total_frequency_scheduled,
-    intervention,
-    intervention_frequency_past_week,
-    intervention_frequency_scheduled,
-    recommendation_frequency_past_week,
-    recommendation_frequency_scheduled,
-    er_past_value=None,
-    prompted=False,
-    prev_mission_score=0.0,
+    er_past_value,
+    prompted,
+    prev_mission_score,
 ):
+    # blocks shared by every candidate rec of one user/mission/slot
     D = get_personal_data_encoding(personal_data)
     H = get_hhs_encoding(hhs)
-    Hc = get_hhs_current_encoding(hhs, pillar)
     ND = get_num_intervention_days_encoding(num_intervention_days)
-    P = get_pillar_encoding(pillar)
     MF = get_mission_frequency_encoding(mission_frequency)
     TF = get_total_frequency_encoding(total_frequency_past_week, scheduled=False) + get_total_frequency_encoding(
         total_frequency_scheduled, scheduled=True
     )
+    ER = get_engagement_rate_encoding(er_past_value if er_past_value is not None else 0.0)
+    PR = get_prompted_encoding(prompted)
+    MS = [max(0.0, min(1.0, float(prev_mission_score)))]
+    return D, H, ND, MF, TF, ER, PR, MS
+
+
+def _get_item_encodings(
+    hhs,
+    pillar,
+    intervention,
+    intervention_frequency_past_week,
+    intervention_frequency_scheduled,
+    recommendation_frequency_past_week,
+    recommendation_frequency_scheduled,
+):
+    # blocks that depend on the candidate rec
+    Hc = get_hhs_current_encoding(hhs, pillar)
+    P = get_pillar_encoding(pillar)
     IT = get_intervention_encoding(intervention)
     NIT = get_num_int_types_encoding(intervention)
     IF = get_intervention_frequency_encoding(
@@ -350,13 +370,10 @@ def get_encodings(
     RF = get_recommendation_frequency_encoding(
         recommendation_frequency_past_week, scheduled=False
     ) + get_recommendation_frequency_encoding(recommendation_frequency_scheduled, scheduled=True)
-    ER = get_engagement_rate_encoding(er_past_value if er_past_value is not None else 0.0)
-    PR = get_prompted_encoding(prompted)
-    MS = [max(0.0, min(1.0, float(prev_mission_score)))]
-    return D, H, Hc, ND, P, MF, TF, IT, NIT, IF, RF, ER, PR, MS
+    return Hc, P, IT, NIT, IF, RF
 
 
-def get_intervention_feature_vector(
+def get_encodings(
     personal_data,
     hhs,
     num_intervention_days,
@@ -373,24 +390,30 @@ def get_intervention_feature_vector(
     prompted=False,
     prev_mission_score=0.0,
 ):
-    D, H, Hc, ND, P, MF, TF, IT, NIT, IF, RF, ER, PR, MS = get_encodings(
+    D, H, ND, MF, TF, ER, PR, MS = _get_context_encodings(
         personal_data,
         hhs,
         num_intervention_days,
-        pillar,
         mission_frequency,
         total_frequency_past_week,
         total_frequency_scheduled,
+        er_past_value,
+        prompted,
+        prev_mission_score,
+    )
+    Hc, P, IT, NIT, IF, RF = _get_item_encodings(
+        hhs,
+        pillar,
         intervention,
         intervention_frequency_past_week,
         intervention_frequency_scheduled,
         recommendation_frequency_past_week,
         recommendation_frequency_scheduled,
-        er_past_value,
-        prompted,
-        prev_mission_score,
     )
+    return D, H, Hc, ND, P, MF, TF, IT, NIT, IF, RF, ER, PR, MS
+
 
+def _assemble_intervention_feature_vector(D, H, Hc, ND, P, MF, TF, IT, NIT, IF, RF, ER, PR, MS, pillar, age_c):
     fv = [1]  # bias
 
     # 1) Base blocks in order
@@ -410,9 +433,8 @@ def get_intervention_feature_vector(
         "PR": PR,
         "MS": MS,
     }
-    for key in BASE_LABELS:
-        if INTERVENTION_MAB_FEATURES.get(key, False):
-            fv.extend(base_parts[key])
+    for key in _ACTIVE_BASE_BLOCKS:
+        fv.extend(base_parts[key])
 
     # 2) Custom scheduled-only interactions
     TF_past, TF_sched = _split_pairs(TF)
@@ -428,7 +450,6 @@ def get_intervention_feature_vector(
     if INTERVENTION_MAB_FEATURES.get("NIT_x_IF_sched", False):
         fv.append(NIT[0] * IF_sched)
 
-    age_c = _get_age_centered(D)
     if INTERVENTION_MAB_FEATURES.get("AGEc_x_RF_sched", False):
         fv.append(age_c * RF_sched)
     if INTERVENTION_MAB_FEATURES.get("AGEc_x_IT", False):
@@ -441,30 +462,92 @@ def get_intervention_feature_vector(
         fv.extend([hhs_c * w for w in IT])
 
     # 3) Optional cartesian families (kept behind flags)
-    INTERACTION_PAIRS = {
-        "D_H": ("D", "H"),
-        "D_P": ("D", "P"),
-        "D_IT": ("D", "IT"),
-        "D_MF": ("D", "MF"),
-        "D_TF": ("D", "TF"),
-        "D_IF": ("D", "IF"),
-        "D_RF": ("D", "RF"),
-        "P_IT": ("P", "IT"),
-        "P_MF": ("P", "MF"),
-        "P_TF": ("P", "TF"),
-        "P_IF": ("P", "IF"),
-        "I_IF": ("IT", "IF"),
-        "I_RF": ("IT", "RF"),
-    }
     blockvals = {"D": D, "H": H, "P": P, "MF": MF, "TF": TF, "IT": IT, "IF": IF, "RF": RF}
-    for inter_key, (a, b) in INTERACTION_PAIRS.items():
-        if INTERVENTION_MAB_FEATURES.get(inter_key, False):
-            A, B = blockvals[a], blockvals[b]
-            fv.extend([x * y for x, y in product(A, B)])
+    for a, b in _ACTIVE_INTERACTION_PAIRS:
+        A, B = blockvals[a], blockvals[b]
+        fv.extend([x * y for x, y in product(A, B)])
 
     return tuple(fv)
 
 
+def get_intervention_feature_vector(
+    personal_data,
+    hhs,
+    num_intervention_days,
+    pillar,
+    mission_frequency,
+    total_frequency_past_week,
+    total_frequency_scheduled,
+    intervention,
+    intervention_frequency_past_week,
+    intervention_frequency_scheduled,
+    recommendation_frequency_past_week,
+    recommendation_frequency_scheduled,
+    er_past_value=None,
+    prompted=False,
+    prev_mission_score=0.0,
+):
+    D, H, Hc, ND, P, MF, TF, IT, NIT, IF, RF, ER, PR, MS = get_encodings(
+        personal_data,
+        hhs,
+        num_intervention_days,
+        pillar,
+        mission_frequency,
+        total_frequency_past_week,
+        total_frequency_scheduled,
+        intervention,
+        intervention_frequency_past_week,
+        intervention_frequency_scheduled,
+        recommendation_frequency_past_week,
+        recommendation_frequency_scheduled,
+        er_past_value,
+        prompted,
+        prev_mission_score,
+    )
+    return _assemble_intervention_feature_vector(
+        D, H, Hc, ND, P, MF, TF, IT, NIT, IF, RF, ER, PR, MS, pillar, _get_age_centered(D)
+    )
+
+
+def get_intervention_feature_vectors(
+    personal_data,
+    hhs,
+    num_intervention_days,
+    mission_frequency,
+    total_frequency_past_week,
+    total_frequency_scheduled,
+    items,
+    er_past_value=None,
+    prompted=False,
+    prev_mission_score=0.0,
+):
+    """
+    Batch form of get_intervention_feature_vector for one user/mission context.
+    - items: iterable of (pillar, intervention, IF_past, IF_sched, RF_past, RF_sched), one per rec
+    Context blocks (demographics, HHS, days, MF, TF, ER, PR, MS) are encoded once.
+    Returns the FV tuples in item order.
+    """
+    D, H, ND, MF, TF, ER, PR, MS = _get_context_encodings(
+        personal_data,
+        hhs,
+        num_intervention_days,
+        mission_frequency,
+        total_frequency_past_week,
+        total_frequency_scheduled,
+        er_past_value,
+        prompted,
+        prev_mission_score,
+    )
+    age_c = _get_age_centered(D)
+    fvs = []
+    for pillar, intervention, if_past, if_sched, rf_past, rf_sched in items:
+        Hc, P, IT, NIT, IF, RF = _get_item_encodings(hhs, pillar, intervention, if_past, if_sched, rf_past, rf_sched)
+        fvs.append(
+            _assemble_intervention_feature_vector(D, H, Hc, ND, P, MF, TF, IT, NIT, IF, RF, ER, PR, MS, pillar, age_c)
+        )
+    return fvs
+
+
 def get_recommendation_feature_vector(recommendation_frequency=None):
     fv = [1]
     if RECOMMENDATION_MAB_FEATURES.get("RF", False):
@@ -30,3 +30,21 @@ def pretty(obj, *, max_chars=None, indent=2, sort_keys=True):
     if max_chars is not None and len(s) > max_chars:
         return s[:max_chars] + f"\n... <truncated {len(s) - max_chars} chars>"
     return s
+
+
+class _LazyPretty:
+    """Defers pretty() until a log record is actually formatted (skipped when the level is off)."""
+
+    __slots__ = ("obj", "kwargs")
+
+    def __init__(self, obj, **kwargs):
+        self.obj = obj
+        self.kwargs = kwargs
+
+    def __str__(self):
+        return pretty(self.obj, **self.kwargs)
+
+
+def lazy_pretty(obj, **kwargs):
+    """pretty() for logging %s arguments: formatting only happens if the record is emitted."""
+    return _LazyPretty(obj, **kwargs)
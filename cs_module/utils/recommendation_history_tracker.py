@@ -1,4 +1,5 @@
-from bisect import insort
+from bisect import bisect_left, insort
+import numpy as np
 from cs_module.utils.encoding import get_intervention_encoding
 from cs_module.config import INTERVENTION_TYPES
 
@@ -9,28 +10,66 @@ class RecommendationHistoryTracker:
     def __init__(self):
         # store (timestamp, process_id, rec_id, mix_vector, mission_id)
         self.history = []
+        # mission_id -> sorted (timestamp, process_id, rec_id), for per-mission window lookups
+        self._by_mission = {}
+        # rec_id -> sorted timestamps, for per-rec window counts
+        self._by_rec = {}
+        # time_window -> read-only counters; cleared whenever history changes
+        self._type_counters_cache = {}
 
     def add_recommendation(self, timestamp, notification_id, rec_id, intervention_type, mission_id):
         """Add a recommendation (auto-sorted by time)."""
         mix = get_intervention_encoding(intervention_type)
         insort(self.history, (timestamp, notification_id, rec_id, mix, mission_id))
+        insort(self._by_mission.setdefault(mission_id, []), (timestamp, notification_id, rec_id))
+        insort(self._by_rec.setdefault(rec_id, []), timestamp)
+        self._type_counters_cache.clear()
+
+    def get_mission_sends(self, mission_id, start, end):
+        """Sends for `mission_id` with start <= timestamp < end, as time-ordered (timestamp, process_id, rec_id)."""
+        sends = self._by_mission.get(mission_id, [])
+        # 1-tuples sort before any entry with the same timestamp
+        return sends[bisect_left(sends, (start,)) : bisect_left(sends, (end,))]
+
+    def _in_window(self, time_window):
+        """History entries with start <= timestamp < end (all of it if time_window is None)."""
+        if time_window is None:
+            return self.history
+        # 1-tuples sort before any entry with the same timestamp
+        return self.history[bisect_left(self.history, (time_window[0],)) : bisect_left(self.history, (time_window[1],))]
 
     def get_count(self, time_window=None, rec_id=None, single_intv=None):
         """Get count of recommendations, optionally filtered by rec_id, intervention, and time window."""
+        if single_intv is None:
+            # pure window counts over sorted timestamps
+            if rec_id is None:
+                if time_window is None:
+                    return len(self.history)
+                return max(
+                    0, bisect_left(self.history, (time_window[1],)) - bisect_left(self.history, (time_window[0],))
+                )
+            sent_ts = self._by_rec.get(rec_id, [])
+            if time_window is None:
+                return len(sent_ts)
+            return max(0, bisect_left(sent_ts, time_window[1]) - bisect_left(sent_ts, time_window[0]))
 
         return sum(
             1
-            for ts, nid, rid, mix, mid in self.history
-            if (time_window is None or (time_window[0] <= ts < time_window[1]))
-            and (rec_id is None or rid == rec_id)
-            and (single_intv is None or (single_intv in mix))
+            for ts, nid, rid, mix, mid in self._in_window(time_window)
+            if (rec_id is None or rid == rec_id) and (single_intv in mix)
         )
 
     def get_type_counters(self, time_window=None):
-        """Return per-type mixture-weighted counters over an optional time window."""
-        counters = [0.0] * len(INTERVENTION_TYPES)
-        for ts, nid, rid, mix, mid in self.history:
-            if time_window is None or (time_window[0] <= ts < time_window[1]):
-                for j, w in enumerate(mix):
-                    counters[j] += w
+        """Return per-type mixture-weighted counters over an optional time window, as a read-only ndarray."""
+        key = None if time_window is None else tuple(time_window)
+        counters = self._type_counters_cache.get(key)
+        if counters is None:
+            mixes = [mix for ts, nid, rid, mix, mid in self._in_window(time_window)]
+            if mixes:
+                # row-by-row reduction: same summation order as accumulating each mix in turn
+                counters = np.asarray(mixes, dtype=np.float64).sum(axis=0)
+            else:
+                counters = np.zeros(len(INTERVENTION_TYPES))
+            counters.setflags(write=False)
+            self._type_counters_cache[key] = counters
         return counters
@@ -0,0 +1,7 @@
+"""WSGI entrypoint for the CS API.
+
+Run with a single worker process (all state lives in memory) and several threads, e.g.:
+    gunicorn -k gthread -w 1 --threads 8 -b 0.0.0.0:8000 cs_module.wsgi:app
+"""
+
+from cs_module.cs_api import app  # noqa: F401